@@ -0,0 +1,120 @@
+"""Per-request cost of the hot ResponseService queries.
+
+Runs each query with statements rebuilt and compiled on every request,
+rebuilt but found in SQLAlchemy's compiled cache, and built once at
+module level with server-side prepared statements. Needs a populated
+database:
+
+    task benchmark --requests 500
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from playground_api.models import Entrevistado, Resposta
+from playground_api.services import (
+    ENTREVISTADOS_STATEMENTS,
+    LOCATION_STATEMENTS,
+    PERGUNTA_RESPOSTAS_STATEMENTS,
+    RESPOSTA_COLUMNS,
+    dimension_id,
+    entrevistados_statements,
+    paginated_statements,
+)
+from playground_api.settings import Settings
+
+PARAMS = {
+    'entrevistados': {'limit': 10, 'offset': 0},
+    'location': {'limit': 10, 'offset': 0, 'location': 'brasília'},
+    'pergunta_respostas': {'limit': 10, 'offset': 0, 'question_id': 1},
+}
+
+CACHED_STATEMENTS = {
+    'entrevistados': lambda: ENTREVISTADOS_STATEMENTS.offset,
+    'location': lambda: LOCATION_STATEMENTS.offset,
+    'pergunta_respostas': lambda: PERGUNTA_RESPOSTAS_STATEMENTS.offset,
+}
+
+
+def pergunta_respostas_statement():
+    return paginated_statements(
+        select(*RESPOSTA_COLUMNS)
+        .join(Resposta.pergunta)
+        .filter(Resposta.pergunta_fk == bindparam('question_id')),
+        Resposta.id,
+    ).offset
+
+
+REBUILT_STATEMENTS = {
+    'entrevistados': lambda: entrevistados_statements().offset,
+    'location': lambda: (
+        entrevistados_statements(
+            Entrevistado.localidade_fk
+            == dimension_id('localidade', bindparam('location'))
+        ).offset
+    ),
+    'pergunta_respostas': pergunta_respostas_statement,
+}
+
+
+async def measure(url, statements, requests, prepare_threshold, options):
+    engine = create_async_engine(
+        url, connect_args={'prepare_threshold': prepare_threshold}
+    )
+    results = {}
+    async with engine.connect() as connection:
+        await connection.execution_options(**options)
+        for name, build in statements.items():
+            start = time.perf_counter()
+            for _ in range(requests):
+                await connection.execute(build(), PARAMS[name])
+            results[name] = (time.perf_counter() - start) / requests * 1000
+    await engine.dispose()
+
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    url = Settings().DATABASE_URL
+
+    runs = {
+        'rebuilt': await measure(
+            url,
+            REBUILT_STATEMENTS,
+            args.requests,
+            prepare_threshold=None,
+            options={'compiled_cache': None},
+        ),
+        'compiled cache': await measure(
+            url,
+            REBUILT_STATEMENTS,
+            args.requests,
+            prepare_threshold=None,
+            options={},
+        ),
+        'module + prepared': await measure(
+            url,
+            CACHED_STATEMENTS,
+            args.requests,
+            prepare_threshold=0,
+            options={},
+        ),
+    }
+
+    print(f'{"ms per request":<20}' + ''.join(f'{run:>20}' for run in runs))
+    for name in PARAMS:
+        print(
+            f'{name:<20}'
+            + ''.join(f'{results[name]:>20.3f}' for results in runs.values())
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
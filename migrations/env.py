@@ -3,7 +3,7 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
-from playground_api.models import table_registry
+from playground_api.models import PARTITION_PATTERN, table_registry
 from playground_api.settings import Settings
 
 # this is the Alembic Config object, which provides
@@ -22,6 +22,13 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = table_registry.metadata
 
+
+def include_name(name, type_, parent_names):
+    # The respostas partitions are created by the migrations and the
+    # importer, they aren't declared by the models.
+    return type_ != 'table' or not PARTITION_PATTERN.fullmatch(name)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -44,6 +51,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={'paramstyle': 'named'},
     )
@@ -67,7 +75,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,107 @@
+"""respondent key not null
+
+Revision ID: c41d2b7e9a05
+Revises: d7420e941d70
+Create Date: 2026-10-19 09:12:44.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d2b7e9a05'
+down_revision: Union[str, Sequence[str], None] = 'd7420e941d70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_DIMENSIONS = [
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+    'localidade',
+    'area',
+    'geracao',
+    'genero',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Respondents left without a natural key by ffa61296ecb7 take the date
+    # of their answers when no other respondent holds that key yet.
+    op.execute(
+        """
+        UPDATE entrevistados
+        SET data_resposta = keyed.data
+        FROM (
+            SELECT DISTINCT ON (e.email_corporativo, r.data)
+                e.id, r.data
+            FROM entrevistados e
+            JOIN respostas r ON r.entrevistado_fk = e.id
+            WHERE e.data_resposta IS NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM entrevistados k
+                WHERE k.email_corporativo = e.email_corporativo
+                AND k.data_resposta = r.data
+            )
+            ORDER BY e.email_corporativo, r.data, e.id
+        ) AS keyed
+        WHERE entrevistados.id = keyed.id
+        """
+    )
+    # The others are copies of a CSV loaded twice. They are removed with
+    # their answers, and the rollups of those days are rebuilt.
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE copied_days ON COMMIT DROP AS
+        SELECT DISTINCT r.data
+        FROM respostas r
+        JOIN entrevistados e ON e.id = r.entrevistado_fk
+        WHERE e.data_resposta IS NULL
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM respostas r
+        USING entrevistados e
+        WHERE e.id = r.entrevistado_fk AND e.data_resposta IS NULL
+        """
+    )
+    op.execute('DELETE FROM entrevistados WHERE data_resposta IS NULL')
+    op.execute(
+        'DELETE FROM respostas_rollup '
+        'WHERE data IN (SELECT data FROM copied_days)'
+    )
+    labels = ', '.join(f'{name}.valor' for name in ROLLUP_DIMENSIONS)
+    joins = ' '.join(
+        f'JOIN dimensoes {name} ON {name}.id = e.{name}_fk'
+        for name in ROLLUP_DIMENSIONS
+    )
+    op.execute(
+        f"""
+        INSERT INTO respostas_rollup
+            (data, pergunta_fk, {', '.join(ROLLUP_DIMENSIONS)}, nota, total)
+        SELECT r.data, r.pergunta_fk, {labels}, r.nota, count(*)
+        FROM respostas r
+        JOIN entrevistados e ON e.id = r.entrevistado_fk
+        {joins}
+        WHERE r.data IN (SELECT data FROM copied_days)
+        GROUP BY r.data, r.pergunta_fk, {labels}, r.nota
+        """
+    )
+    op.execute('UPDATE dataset_versions SET version = version + 1')
+    op.alter_column('entrevistados', 'data_resposta',
+               existing_type=sa.Date(),
+               nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('entrevistados', 'data_resposta',
+               existing_type=sa.Date(),
+               nullable=True)
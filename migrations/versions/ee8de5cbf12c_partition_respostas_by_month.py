@@ -0,0 +1,101 @@
+"""partition respostas by month
+
+Revision ID: ee8de5cbf12c
+Revises: 4b381ecbacb0
+Create Date: 2026-10-18 20:41:07.153062
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee8de5cbf12c'
+down_revision: Union[str, Sequence[str], None] = '4b381ecbacb0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, created_at, updated_at, data, nota, comentario, pergunta_fk, entrevistado_fk'
+INDEXES = {
+    'ix_respostas_data': ['data'],
+    'ix_respostas_entrevistado_fk': ['entrevistado_fk'],
+    'ix_respostas_pergunta_fk_id': ['pergunta_fk', 'id'],
+    'ix_respostas_pergunta_fk_nota': ['pergunta_fk', 'nota'],
+}
+
+
+def create_respostas(*primary_key, unique_name, unique_columns, **kwargs):
+    op.create_table('respostas',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('nota', sa.SmallInteger(), nullable=False),
+    sa.Column('comentario', sa.Text(), nullable=True),
+    sa.Column('pergunta_fk', sa.Integer(), nullable=False),
+    sa.Column('entrevistado_fk', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('respostas_id_seq'::regclass)"), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['entrevistado_fk'], ['entrevistados.id'], ),
+    sa.ForeignKeyConstraint(['pergunta_fk'], ['perguntas.id'], ),
+    sa.PrimaryKeyConstraint(*primary_key),
+    sa.UniqueConstraint(*unique_columns, name=unique_name),
+    **kwargs,
+    )
+
+
+def replace_respostas(create):
+    # The answers are copied to a new table, keeping the id sequence.
+    op.rename_table('respostas', 'respostas_old')
+    op.execute('ALTER TABLE respostas_old RENAME CONSTRAINT respostas_pkey TO respostas_old_pkey')
+    op.execute('ALTER SEQUENCE respostas_id_seq OWNED BY NONE')
+    op.execute('DROP INDEX ' + ', '.join(INDEXES))
+    for constraint in ('uq_respostas_entrevistado_fk_pergunta_fk', 'uq_respostas_entrevistado_fk_pergunta_fk_data'):
+        op.execute(f'ALTER TABLE respostas_old DROP CONSTRAINT IF EXISTS {constraint}')
+    create()
+    op.execute(f'INSERT INTO respostas ({COLUMNS}) SELECT {COLUMNS} FROM respostas_old')
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'respostas', columns, unique=False)
+    op.drop_table('respostas_old')
+    op.execute('ALTER SEQUENCE respostas_id_seq OWNED BY respostas.id')
+
+
+def create_partitions():
+    op.execute('CREATE TABLE respostas_default PARTITION OF respostas DEFAULT')
+    months = op.get_bind().execute(
+        sa.text("SELECT DISTINCT date_trunc('month', data)::date FROM respostas_old")
+    ).scalars()
+    for month in months:
+        op.execute(
+            f"CREATE TABLE respostas_{month:%Y_%m} PARTITION OF respostas "
+            f"FOR VALUES FROM ('{month}') TO ('{month}'::date + interval '1 month')"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    def create():
+        # ### commands auto generated by Alembic - please adjust! ###
+        create_respostas(
+            'id',
+            'data',
+            unique_name='uq_respostas_entrevistado_fk_pergunta_fk_data',
+            unique_columns=['entrevistado_fk', 'pergunta_fk', 'data'],
+            postgresql_partition_by='RANGE (data)',
+        )
+        # ### end Alembic commands ###
+        create_partitions()
+
+    replace_respostas(create)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    def create():
+        create_respostas(
+            'id',
+            unique_name='uq_respostas_entrevistado_fk_pergunta_fk',
+            unique_columns=['entrevistado_fk', 'pergunta_fk'],
+        )
+
+    replace_respostas(create)
@@ -0,0 +1,51 @@
+"""incremental import keys
+
+Revision ID: ffa61296ecb7
+Revises: e336a6cbad45
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ffa61296ecb7'
+down_revision: Union[str, Sequence[str], None] = 'e336a6cbad45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('entrevistados', sa.Column('data_resposta', sa.Date(), nullable=True))
+    op.add_column('entrevistados', sa.Column('row_hash', sa.String(length=64), nullable=True))
+    # Only the first respondent of every (email, date) pair receives the
+    # natural key, so databases loaded twice before this migration keep
+    # their duplicated rows without breaking the unique constraint.
+    op.execute(
+        """
+        UPDATE entrevistados
+        SET data_resposta = keyed.data
+        FROM (
+            SELECT DISTINCT ON (e.email_corporativo, r.data)
+                e.id, r.data
+            FROM entrevistados e
+            JOIN respostas r ON r.entrevistado_fk = e.id
+            ORDER BY e.email_corporativo, r.data, e.id
+        ) AS keyed
+        WHERE entrevistados.id = keyed.id
+        """
+    )
+    op.create_unique_constraint('uq_entrevistados_email_corporativo_data_resposta', 'entrevistados', ['email_corporativo', 'data_resposta'])
+    op.create_unique_constraint('uq_respostas_entrevistado_fk_pergunta_fk', 'respostas', ['entrevistado_fk', 'pergunta_fk'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_respostas_entrevistado_fk_pergunta_fk', 'respostas', type_='unique')
+    op.drop_constraint('uq_entrevistados_email_corporativo_data_resposta', 'entrevistados', type_='unique')
+    op.drop_column('entrevistados', 'row_hash')
+    op.drop_column('entrevistados', 'data_resposta')
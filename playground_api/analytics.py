@@ -0,0 +1,285 @@
+import asyncio
+from contextlib import suppress
+from datetime import date
+from typing import Annotated
+
+import numpy as np
+from fastapi import Depends
+from sqlalchemy import func, select
+
+from playground_api.cache import ResultCache, get_cache
+from playground_api.database import connect_replica
+from playground_api.models import (
+    DIMENSIONS,
+    Dimensao,
+    Entrevistado,
+    Pergunta,
+    Resposta,
+)
+from playground_api.services import (
+    ENPS_QUESTION,
+    MAX_DETRACTOR_SCORE,
+    MIN_PROMOTER_SCORE,
+    SCORES,
+    DatasetVersionService,
+)
+
+EPOCH = date(1970, 1, 1)
+SNAPSHOT_CHUNK_SIZE = 10000
+
+SNAPSHOT_QUERY = (
+    select(
+        Resposta.nota,
+        (Resposta.data - EPOCH).label('day'),
+        Resposta.pergunta_fk,
+        *(
+            getattr(Entrevistado, f'{dimension}_fk')
+            for dimension in DIMENSIONS
+        ),
+    )
+    .join(Entrevistado, Entrevistado.id == Resposta.entrevistado_fk)
+    # Scores outside the histograms would land in another group's bins.
+    .filter(Resposta.nota.between(0, SCORES - 1))
+)
+
+
+def encode(ids, id_labels):
+    # Dictionary encoding: sorted distinct labels plus one small code per
+    # row, through a lookup table indexed by the database ids.
+    labels = sorted(set(id_labels.values()))
+    codes = {label: code for code, label in enumerate(labels)}
+    lookup = np.zeros(max(id_labels, default=0) + 1, dtype=np.int32)
+    for row_id, label in id_labels.items():
+        lookup[row_id] = codes[label]
+
+    return lookup[ids], labels
+
+
+def histogram_stats(histograms):
+    # Same results as the SQL calculations, computed for every group at
+    # once from its score counts.
+    counts = histograms.sum(axis=1)
+    cumulative = histograms.cumsum(axis=1)
+    position = 0.5 * (counts - 1)
+    lower_rank, upper_rank = np.floor(position), np.ceil(position)
+    lower = (cumulative <= lower_rank[:, None]).sum(axis=1)
+    upper = (cumulative <= upper_rank[:, None]).sum(axis=1)
+    promoters = histograms[:, MIN_PROMOTER_SCORE:].sum(axis=1)
+    detractors = histograms[:, : MAX_DETRACTOR_SCORE + 1].sum(axis=1)
+
+    return {
+        'count': counts,
+        'mean': histograms @ np.arange(SCORES) / counts,
+        'median': lower + (upper - lower) * (position - lower_rank),
+        'nps': np.round((promoters - detractors) / counts * 100, 2),
+    }
+
+
+class AnswerSnapshot:
+    def __init__(self, version, scores, days, questions, dimensions):
+        self.version = version
+        self._scores = scores
+        self._days = days
+        self._questions, self._question_labels = questions
+        self._codes = {}
+        self._labels = {}
+        for dimension, (codes, labels) in dimensions.items():
+            self._codes[dimension] = codes
+            self._labels[dimension] = labels
+
+    def __len__(self):
+        return len(self._scores)
+
+    def _mask(self, filters, pergunta, start, end):
+        columns = [
+            (self._codes[dimension], self._labels[dimension], value)
+            for dimension, value in filters.items()
+        ]
+        if pergunta is not None:
+            columns.append((self._questions, self._question_labels, pergunta))
+
+        mask = np.ones(len(self), dtype=bool)
+        for codes, labels, value in columns:
+            if value not in labels:
+                return None
+            mask &= codes == labels.index(value)
+        if start is not None:
+            mask &= self._days >= (start - EPOCH).days
+        if end is not None:
+            mask &= self._days <= (end - EPOCH).days
+
+        return mask
+
+    def breakdown(
+        self, group_by=(), filters=None, pergunta=None, start=None, end=None
+    ):
+        mask = self._mask(filters or {}, pergunta, start, end)
+        if mask is None or not mask.any():
+            return []
+
+        # Every (question, group) pair becomes one integer key, and the
+        # score histograms of all the keys come from a single bincount.
+        shape = (
+            len(self._question_labels),
+            *(len(self._labels[dimension]) for dimension in group_by),
+        )
+        keys = np.ravel_multi_index(
+            (
+                self._questions[mask],
+                *(self._codes[dimension][mask] for dimension in group_by),
+            ),
+            shape,
+        )
+        groups, inverse = np.unique(keys, return_inverse=True)
+        histograms = np.bincount(
+            inverse * SCORES + self._scores[mask],
+            minlength=len(groups) * SCORES,
+        ).reshape(len(groups), SCORES)
+        stats = {
+            key: values.tolist()
+            for key, values in histogram_stats(histograms).items()
+        }
+        question_codes, *group_codes = (
+            codes.tolist() for codes in np.unravel_index(groups, shape)
+        )
+
+        rows = []
+        for index, question_code in enumerate(question_codes):
+            pergunta = self._question_labels[question_code]
+            rows.append({
+                'pergunta': pergunta,
+                'group': {
+                    dimension: self._labels[dimension][codes[index]]
+                    for dimension, codes in zip(group_by, group_codes)
+                },
+                'count': stats['count'][index],
+                'mean': stats['mean'][index],
+                'median': stats['median'][index],
+                'nps': (
+                    stats['nps'][index] if pergunta == ENPS_QUESTION else None
+                ),
+                'distribution': histograms[index].tolist(),
+            })
+
+        return rows
+
+
+COUNT_QUERY = select(func.count(Resposta.id))
+
+
+async def load_columns(connection):
+    # The answers are streamed in chunks straight into one int32 array,
+    # sized from a count and grown if an import adds answers meanwhile.
+    width = len(SNAPSHOT_QUERY.selected_columns)
+    capacity = await connection.scalar(COUNT_QUERY)
+    columns = np.empty((capacity, width), dtype=np.int32)
+    filled = 0
+    result = await connection.stream(
+        SNAPSHOT_QUERY.execution_options(yield_per=SNAPSHOT_CHUNK_SIZE)
+    )
+    async for rows in result.partitions():
+        end = filled + len(rows)
+        if end > len(columns):
+            columns = np.concatenate((
+                columns,
+                np.empty((end - len(columns), width), np.int32),
+            ))
+        columns[filled:end] = rows
+        filled = end
+
+    return columns[:filled]
+
+
+async def load_snapshot(connection, version):
+    columns = await load_columns(connection)
+    questions = dict(
+        (await connection.execute(select(Pergunta.id, Pergunta.pergunta)))
+        .tuples()
+        .all()
+    )
+    dimensoes = {dimension: {} for dimension in DIMENSIONS}
+    result = await connection.execute(
+        select(Dimensao.id, Dimensao.tipo, Dimensao.valor)
+    )
+    for dimensao_id, tipo, valor in result:
+        dimensoes[tipo][dimensao_id] = valor
+
+    return AnswerSnapshot(
+        version,
+        columns[:, 0].astype(np.int8),
+        columns[:, 1].astype(np.int32),
+        encode(columns[:, 2], questions),
+        {
+            dimension: encode(columns[:, 3 + index], dimensoes[dimension])
+            for index, dimension in enumerate(DIMENSIONS)
+        },
+    )
+
+
+class AnalyticsEngine:
+    def __init__(self, connect=connect_replica):
+        self._connect = connect
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+        self._refreshing = None
+
+    def _is_current(self, version):
+        return self._snapshot is not None and self._snapshot.version == version
+
+    @property
+    def version(self):
+        return None if self._snapshot is None else self._snapshot.version
+
+    async def refresh(self, version):
+        # Loaded on a connection of its own, as a refresh can outlive the
+        # request that started it.
+        async with self._lock:
+            if not self._is_current(version):
+                connection = await self._connect()
+                try:
+                    self._snapshot = await load_snapshot(connection, version)
+                finally:
+                    await connection.close()
+
+        return self._snapshot
+
+    async def warm_up(self):
+        connection = await self._connect()
+        try:
+            version = await DatasetVersionService(connection).get()
+        finally:
+            await connection.close()
+
+        await self.refresh(version)
+
+    async def snapshot(self, version):
+        # After an import the previous snapshot is served while the new one
+        # loads in the background; only a process without one has to wait.
+        if self._snapshot is None:
+            return await self.refresh(version)
+
+        if not self._is_current(version) and (
+            self._refreshing is None or self._refreshing.done()
+        ):
+            self._refreshing = asyncio.create_task(self.refresh(version))
+
+        return self._snapshot
+
+    async def stop(self):
+        if self._refreshing is not None and not self._refreshing.done():
+            self._refreshing.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._refreshing
+
+    def clear(self):
+        self._snapshot = None
+        self._refreshing = None
+
+
+analytics_engine = AnalyticsEngine()
+
+
+async def get_snapshot(
+    cache: Annotated[ResultCache, Depends(get_cache)],
+):
+    return await analytics_engine.snapshot(cache.version)
@@ -1,14 +1,30 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 
-from playground_api.routes import calculations_route, responses_route
+from playground_api.analytics import analytics_engine
+from playground_api.routes import (
+    calculations_route,
+    metrics_route,
+    responses_route,
+)
 from playground_api.settings import Settings
 
 settings = Settings()
 
-app = FastAPI(version=settings.VERSION)
+
+@asynccontextmanager
+async def lifespan(app):
+    # The analytics snapshot is loaded before serving, so no request waits
+    # for it.
+    await analytics_engine.warm_up()
+    yield
+    await analytics_engine.stop()
+
+
+app = FastAPI(version=settings.VERSION, lifespan=lifespan)
 
 
 @app.get('/', include_in_schema=False)
@@ -28,3 +44,4 @@ def version():
 
 app.include_router(responses_route.router)
 app.include_router(calculations_route.router)
+app.include_router(metrics_route.router)
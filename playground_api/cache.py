@@ -0,0 +1,286 @@
+import asyncio
+import json
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from http import HTTPStatus
+from time import monotonic
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Request, Response
+from redis.asyncio import Redis
+
+from playground_api.database import connect
+from playground_api.services import DatasetVersionService
+from playground_api.settings import Settings
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key):
+        """Returns a (hit, value) pair."""
+
+    @abstractmethod
+    async def set(self, key, value, ttl):
+        """Stores a value for ttl seconds."""
+
+    @abstractmethod
+    async def clear(self):
+        """Drops every stored value."""
+
+    async def acquire(self, key, ttl):
+        """Returns whether this process may compute the key's value."""
+        return True
+
+    async def release(self, key):
+        """Lets other processes compute the key's value."""
+
+    def size(self):
+        return None
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            self._entries.pop(key, None)
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    async def set(self, key, value, ttl):
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self):
+        self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    # Eviction is left to the server (maxmemory-policy allkeys-lru), values
+    # are stored as JSON so every API worker can read them.
+    def __init__(self, client, prefix='playground:'):
+        self._client = client
+        self._prefix = prefix
+        self._token = uuid.uuid4().hex
+        self._release = client.register_script(RELEASE_LOCK_SCRIPT)
+
+    async def get(self, key):
+        value = await self._client.get(self._prefix + key)
+        if value is None:
+            return False, None
+
+        return True, json.loads(value)
+
+    async def set(self, key, value, ttl):
+        await self._client.set(
+            self._prefix + key, json.dumps(value), px=max(1, int(ttl * 1000))
+        )
+
+    async def acquire(self, key, ttl):
+        # Only one worker computes a missing key; the lock expires on its
+        # own if that worker dies.
+        return bool(
+            await self._client.set(
+                f'{self._prefix}{key}:lock',
+                self._token,
+                nx=True,
+                px=max(1, int(ttl * 1000)),
+            )
+        )
+
+    async def release(self, key):
+        # Compared and deleted in one step, so a lock that expired and was
+        # taken by another worker is left alone.
+        await self._release(
+            keys=[f'{self._prefix}{key}:lock'], args=[self._token]
+        )
+
+    async def clear(self):
+        keys = [
+            key async for key in self._client.scan_iter(self._prefix + '*')
+        ]
+        if keys:
+            await self._client.delete(*keys)
+
+
+class ResultCache:
+    def __init__(
+        self, backend, ttl, version_ttl, lock_ttl=30.0, lock_poll=0.05
+    ):
+        self._backend = backend
+        self._ttl = ttl
+        self._version_ttl = version_ttl
+        self._lock_ttl = lock_ttl
+        self._lock_poll = lock_poll
+        self._version = None
+        self._version_expires_at = 0.0
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def sync_version(self, load_version):
+        # The dataset version (bumped by the importer) is part of every key,
+        # and is read at most once per version_ttl.
+        now = monotonic()
+        if now < self._version_expires_at:
+            return
+
+        self._version = await load_version()
+        self._version_expires_at = now + self._version_ttl
+
+    async def get_or_compute(self, key, compute):
+        key = f'{self._version}:{key}'
+        while True:
+            hit, value = await self._backend.get(key)
+            if hit:
+                self.hits += 1
+                return value
+
+            # Concurrent misses of the same key wait for the first
+            # computation instead of hitting the database again.
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._compute(key, compute)
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Retries when the computing request was cancelled, not
+                # this one.
+                if asyncio.current_task().cancelling():
+                    raise
+
+    async def _compute_shared(self, key, compute):
+        # Workers sharing the backend wait for the one holding the key's
+        # lock to store the value.
+        while not await self._backend.acquire(key, self._lock_ttl):
+            await asyncio.sleep(self._lock_poll)
+            hit, value = await self._backend.get(key)
+            if hit:
+                return value
+
+        try:
+            value = await compute()
+            await self._backend.set(key, value, self._ttl)
+        finally:
+            await self._backend.release(key)
+
+        return value
+
+    async def _compute(self, key, compute):
+        self.misses += 1
+        inflight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = inflight
+        try:
+            value = await self._compute_shared(key, compute)
+            inflight.set_result(value)
+        except Exception as exc:
+            inflight.set_exception(exc)
+            # Marks the exception as retrieved when nobody was waiting
+            inflight.exception()
+            raise
+        finally:
+            del self._inflight[key]
+            inflight.cancel()
+
+        return value
+
+    async def clear(self):
+        await self._backend.clear()
+        self._version = None
+        self._version_expires_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'size': self._backend.size(),
+            'version': self._version,
+        }
+
+
+def create_backend(settings):
+    if settings.CACHE_URL:
+        return RedisCacheBackend(Redis.from_url(settings.CACHE_URL))
+
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+settings = Settings()
+
+result_cache = ResultCache(
+    create_backend(settings),
+    settings.CACHE_TTL_SECONDS,
+    settings.CACHE_VERSION_CHECK_SECONDS,
+    settings.CACHE_LOCK_SECONDS,
+    settings.CACHE_LOCK_POLL_SECONDS,
+)
+
+
+async def get_cache(request: Request):
+    # The version is read on a short-lived connection, only once it expired,
+    # so 304 responses and calculations served from the cache don't check
+    # out a pooled connection.
+    async def load_version():
+        connection = await connect(request)
+        try:
+            return await DatasetVersionService(connection).get()
+        finally:
+            await connection.close()
+
+    await result_cache.sync_version(load_version)
+
+    return result_cache
+
+
+def parse_etags(header):
+    # Weak validators match too, If-None-Match uses the weak comparison
+    return {etag.strip().removeprefix('W/') for etag in header.split(',')}
+
+
+async def check_etag(
+    request: Request,
+    response: Response,
+    cache: Annotated[ResultCache, Depends(get_cache)],
+):
+    etag = f'"{settings.VERSION}-{cache.version}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={settings.HTTP_CACHE_MAX_AGE}',
+    }
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        raise HTTPException(HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+
+    return headers
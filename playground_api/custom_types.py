@@ -1,10 +1,33 @@
+from collections.abc import Awaitable, Callable
 from typing import Annotated
 
 from fastapi import Depends, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
-from playground_api.database import get_session
-from playground_api.schemas import PaginationParams
+from playground_api.analytics import AnswerSnapshot, get_snapshot
+from playground_api.cache import ResultCache, check_etag, get_cache
+from playground_api.database import get_connection_factory, get_session
+from playground_api.schemas import (
+    BreakdownParams,
+    DateRangeParams,
+    DimensionFilterParams,
+    LocationCountParams,
+    PaginationParams,
+    PercentileParams,
+    TrendParams,
+)
 
 T_Database = Annotated[AsyncSession, Depends(get_session)]
+T_ConnectionFactory = Annotated[
+    Callable[[], Awaitable[AsyncConnection]], Depends(get_connection_factory)
+]
 T_Pagination = Annotated[PaginationParams, Query()]
+T_Percentiles = Annotated[PercentileParams, Query()]
+T_DateRange = Annotated[DateRangeParams, Query()]
+T_Breakdown = Annotated[BreakdownParams, Query()]
+T_DimensionFilters = Annotated[DimensionFilterParams, Query()]
+T_Trend = Annotated[TrendParams, Query()]
+T_Locations = Annotated[LocationCountParams, Query()]
+T_Cache = Annotated[ResultCache, Depends(get_cache)]
+T_CacheHeaders = Annotated[dict[str, str], Depends(check_etag)]
+T_Snapshot = Annotated[AnswerSnapshot, Depends(get_snapshot)]
@@ -1,10 +1,148 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from itertools import count
+from time import monotonic
+from typing import Annotated
+
+from fastapi import Depends, Request
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    create_async_engine,
+)
 
 from playground_api.settings import Settings
 
-async_engine = create_async_engine(Settings().DATABASE_URL)
+READ_METHODS = {'GET', 'HEAD'}
+
+
+def engine_options(settings, limit_statements=True):
+    options = {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        # psycopg prepares a statement on the server once its SQL text ran
+        # this many times on a connection (None disables it, as required
+        # behind PgBouncer in transaction mode)
+        'connect_args': {'prepare_threshold': settings.DB_PREPARE_THRESHOLD},
+    }
+    statement_timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if limit_statements and statement_timeout:
+        options['connect_args']['options'] = (
+            f'-c statement_timeout={statement_timeout}'
+        )
+
+    return options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas, retry_after):
+        self._primary = primary
+        self._replicas = replicas
+        self._retry_after = retry_after
+        self._down_until = [0.0] * len(replicas)
+        self._turns = count()
+
+    def _healthy_replicas(self):
+        # Round-robin starting point, skipping replicas that failed recently
+        now = monotonic()
+        start = next(self._turns)
+        for offset in range(len(self._replicas)):
+            index = (start + offset) % len(self._replicas)
+            if self._down_until[index] <= now:
+                yield index
+
+    async def connect(self):
+        for index in self._healthy_replicas():
+            try:
+                return await self._replicas[index].connect()
+            except DBAPIError:
+                self._down_until[index] = monotonic() + self._retry_after
+
+        return await self._primary.connect()
+
+    async def connect_primary(self):
+        return await self._primary.connect()
+
+    def health(self):
+        now = monotonic()
+
+        return [down_until <= now for down_until in self._down_until]
+
+
+settings = Settings()
+
+async_engine = create_async_engine(
+    settings.DATABASE_URL, **engine_options(settings)
+)
+
+replica_router = ReplicaRouter(
+    async_engine,
+    [
+        create_async_engine(url, **engine_options(settings))
+        for url in settings.REPLICA_URLS
+    ],
+    settings.REPLICA_RETRY_SECONDS,
+)
+
+
+async def connect(request):
+    if request.method in READ_METHODS:
+        return await replica_router.connect()
+
+    return await replica_router.connect_primary()
+
+
+async def connect_replica():
+    # For work done outside of a request, which only reads
+    return await replica_router.connect()
+
+
+async def get_connection(request: Request):
+    # Aggregate routes run a single read, so they skip the ORM session
+    connection = await connect(request)
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+async def get_connection_factory(request: Request):
+    # Routes that may answer from a cache open a connection only once they
+    # need one.
+    connections = []
+
+    async def open_connection():
+        connection = await connect(request)
+        connections.append(connection)
+
+        return connection
+
+    try:
+        yield open_connection
+    finally:
+        for connection in connections:
+            await connection.close()
 
 
-async def get_session():
-    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+async def get_session(
+    connection: Annotated[AsyncConnection, Depends(get_connection)],
+):
+    # Built on the request connection, so a request holds a single pooled
+    # connection and reads from a single replica.
+    async with AsyncSession(
+        bind=connection, expire_on_commit=False
+    ) as session:
         yield session
@@ -1,11 +1,43 @@
+import re
 from datetime import date, datetime
 
-from sqlalchemy import Date, ForeignKey, SmallInteger, String, Text, func
+from sqlalchemy import (
+    DDL,
+    Date,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+)
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+DEFAULT_PARTITION = 'respostas_default'
+MONTHLY_PARTITION = 'respostas_{:%Y_%m}'
+PARTITION_PATTERN = re.compile(r'respostas_(default|\d{4}_\d{2})')
+
+DIMENSIONS = (
+    'genero',
+    'geracao',
+    'area',
+    'cargo',
+    'funcao',
+    'localidade',
+    'tempo_empresa',
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+)
+
 
 class BaseModel(AsyncAttrs):
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
@@ -20,25 +52,102 @@ class BaseModel(AsyncAttrs):
     )
 
 
+@table_registry.mapped_as_dataclass
+class Dimensao(BaseModel):
+    # Distinct values of the low cardinality respondent attributes, so
+    # entrevistados stores small integer keys instead of repeated strings.
+    __tablename__ = 'dimensoes'
+    __table_args__ = (
+        UniqueConstraint('tipo', 'valor', name='uq_dimensoes_tipo_valor'),
+    )
+
+    tipo: Mapped[str] = mapped_column(String(20))
+    valor: Mapped[str] = mapped_column(String(50))
+
+
 @table_registry.mapped_as_dataclass
 class Entrevistado(BaseModel):
     __tablename__ = 'entrevistados'
+    __table_args__ = (
+        UniqueConstraint(
+            'email_corporativo',
+            'data_resposta',
+            name='uq_entrevistados_email_corporativo_data_resposta',
+        ),
+        Index('ix_entrevistados_localidade_fk_id', 'localidade_fk', 'id'),
+    )
 
     nome: Mapped[str] = mapped_column(String(150))
     email: Mapped[str] = mapped_column(String(150))
     email_corporativo: Mapped[str] = mapped_column(String(150))
-    genero: Mapped[str] = mapped_column(String(15))
-    geracao: Mapped[str] = mapped_column(String(15))
-    area: Mapped[str] = mapped_column(String(50))
-    cargo: Mapped[str] = mapped_column(String(50))
-    funcao: Mapped[str] = mapped_column(String(50))
-    localidade: Mapped[str] = mapped_column(String(50))
-    tempo_empresa: Mapped[str] = mapped_column(String(50))
-    n0_empresa: Mapped[str] = mapped_column(String(50))
-    n1_diretoria: Mapped[str] = mapped_column(String(50))
-    n2_gerencia: Mapped[str] = mapped_column(String(50))
-    n3_coordenacao: Mapped[str] = mapped_column(String(50))
-    n4_area: Mapped[str] = mapped_column(String(50))
+    genero_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    genero_dimensao: Mapped[Dimensao] = relationship(foreign_keys=[genero_fk])
+    geracao_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    geracao_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[geracao_fk]
+    )
+    area_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    area_dimensao: Mapped[Dimensao] = relationship(foreign_keys=[area_fk])
+    cargo_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    cargo_dimensao: Mapped[Dimensao] = relationship(foreign_keys=[cargo_fk])
+    funcao_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    funcao_dimensao: Mapped[Dimensao] = relationship(foreign_keys=[funcao_fk])
+    localidade_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    localidade_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[localidade_fk]
+    )
+    tempo_empresa_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    tempo_empresa_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[tempo_empresa_fk]
+    )
+    n0_empresa_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    n0_empresa_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[n0_empresa_fk]
+    )
+    n1_diretoria_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    n1_diretoria_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[n1_diretoria_fk]
+    )
+    n2_gerencia_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    n2_gerencia_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[n2_gerencia_fk]
+    )
+    n3_coordenacao_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    n3_coordenacao_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[n3_coordenacao_fk]
+    )
+    n4_area_fk: Mapped[int] = mapped_column(
+        ForeignKey('dimensoes.id'), init=False
+    )
+    n4_area_dimensao: Mapped[Dimensao] = relationship(
+        foreign_keys=[n4_area_fk]
+    )
+    data_resposta: Mapped[date] = mapped_column(Date())
+    row_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, default=None
+    )
 
     respostas: Mapped[list['Resposta']] = relationship(init=False)
 
@@ -47,7 +156,7 @@ class Entrevistado(BaseModel):
 class Pergunta(BaseModel):
     __tablename__ = 'perguntas'
 
-    pergunta: Mapped[str] = mapped_column(String(100))
+    pergunta: Mapped[str] = mapped_column(String(100), index=True)
     respostas: Mapped[list['Resposta']] = relationship(
         init=False, back_populates='pergunta'
     )
@@ -55,9 +164,27 @@ class Pergunta(BaseModel):
 
 @table_registry.mapped_as_dataclass
 class Resposta(BaseModel):
+    # Range partitioned by month, unique constraints (and the primary key)
+    # must include the partition key.
     __tablename__ = 'respostas'
+    __table_args__ = (
+        UniqueConstraint(
+            'entrevistado_fk',
+            'pergunta_fk',
+            'data',
+            name='uq_respostas_entrevistado_fk_pergunta_fk_data',
+        ),
+        # Index-only scans for the NPS and percentile aggregates
+        Index('ix_respostas_pergunta_fk_nota', 'pergunta_fk', 'nota'),
+        # Answers of a question paginated by id
+        Index('ix_respostas_pergunta_fk_id', 'pergunta_fk', 'id'),
+        {'postgresql_partition_by': 'RANGE (data)'},
+    )
 
-    data: Mapped[date] = mapped_column(Date(), index=True)
+    id: Mapped[int] = mapped_column(
+        init=False, primary_key=True, autoincrement=True
+    )
+    data: Mapped[date] = mapped_column(Date(), primary_key=True, index=True)
     nota: Mapped[int] = mapped_column(SmallInteger())
     comentario: Mapped[str] = mapped_column(Text(), nullable=True)
     pergunta_fk: Mapped[int] = mapped_column(
@@ -70,3 +197,47 @@ class Resposta(BaseModel):
     entrevistado: Mapped[Entrevistado] = relationship(
         back_populates='respostas'
     )
+
+
+# Answers without a monthly partition (created by the importer) land here
+event.listen(
+    Resposta.__table__,
+    'after_create',
+    DDL(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF respostas DEFAULT'),
+)
+
+
+@table_registry.mapped_as_dataclass
+class RespostaRollup(BaseModel):
+    __tablename__ = 'respostas_rollup'
+    __table_args__ = (
+        # Location counts only read the rows of the requested locations
+        Index(
+            'ix_respostas_rollup_localidade_pergunta_fk',
+            'localidade',
+            'pergunta_fk',
+        ),
+    )
+
+    data: Mapped[date] = mapped_column(Date(), index=True)
+    pergunta_fk: Mapped[int] = mapped_column(
+        ForeignKey('perguntas.id'), index=True
+    )
+    n0_empresa: Mapped[str] = mapped_column(String(50))
+    n1_diretoria: Mapped[str] = mapped_column(String(50))
+    n2_gerencia: Mapped[str] = mapped_column(String(50))
+    n3_coordenacao: Mapped[str] = mapped_column(String(50))
+    n4_area: Mapped[str] = mapped_column(String(50))
+    localidade: Mapped[str] = mapped_column(String(50))
+    area: Mapped[str] = mapped_column(String(50))
+    geracao: Mapped[str] = mapped_column(String(15))
+    genero: Mapped[str] = mapped_column(String(15))
+    nota: Mapped[int] = mapped_column(SmallInteger())
+    total: Mapped[int] = mapped_column(Integer())
+
+
+@table_registry.mapped_as_dataclass
+class DatasetVersion(BaseModel):
+    __tablename__ = 'dataset_versions'
+
+    version: Mapped[int] = mapped_column(Integer(), default=0)
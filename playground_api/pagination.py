@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps([last_id]).encode()
+
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        payload = base64.urlsafe_b64decode(cursor + padding)
+        (last_id,) = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError('invalid cursor') from exc
+
+    # bool is an int subclass, so `[true]` must be rejected explicitly
+    if type(last_id) is not int:
+        raise ValueError('invalid cursor')
+
+    return last_id
+
+
+def next_cursor(items, limit: int) -> str | None:
+    if len(items) < limit:
+        return None
+
+    return encode_cursor(items[-1].id)
@@ -1,31 +1,68 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from playground_api.custom_types import T_Database
+from playground_api.cache import check_etag
+from playground_api.custom_types import (
+    T_Breakdown,
+    T_Cache,
+    T_ConnectionFactory,
+    T_DateRange,
+    T_DimensionFilters,
+    T_Locations,
+    T_Percentiles,
+    T_Snapshot,
+    T_Trend,
+)
 from playground_api.schemas import (
+    BreakdownResponse,
     CountResponse,
+    HierarchyResponse,
+    HistogramResponse,
+    ListBreakdownResponse,
+    ListHistogramsResponse,
+    ListLocationCountsResponse,
     ListMediansResponse,
+    ListPercentilesResponse,
+    ListTrendResponse,
+    LocationCountResponse,
     MedianResponse,
     NPSResponse,
+    PercentileResponse,
+    TrendResponse,
 )
 from playground_api.services import CalculationService
+from playground_api.settings import Settings
+
+settings = Settings()
 
-router = APIRouter(prefix='/calculations', tags=['Calculations'])
+router = APIRouter(
+    prefix='/calculations',
+    tags=['Calculations'],
+    dependencies=[Depends(check_etag)],
+)
 
 
 @router.get('/nps', response_model=NPSResponse)
-async def calculate_nps(session: T_Database):
-    service = CalculationService(session)
+async def calculate_nps(
+    dates: T_DateRange, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
 
-    result = await service.calculate_nps()
+    result = await service.calculate_nps(dates.start, dates.end)
 
     return NPSResponse(nps=result)
 
 
 @router.get('/medians', response_model=ListMediansResponse)
-async def calculate_medians(session: T_Database):
-    service = CalculationService(session)
+async def calculate_medians(
+    dates: T_DateRange, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
 
-    medians = await service.calculate_medians()
+    medians = await service.calculate_medians(dates.start, dates.end)
     medians_response = []
     for pergunta in medians:
         median = medians[pergunta]
@@ -36,10 +73,109 @@ async def calculate_medians(session: T_Database):
     return ListMediansResponse(medians=medians_response)
 
 
+@router.get('/percentiles', response_model=ListPercentilesResponse)
+async def calculate_percentiles(
+    params: T_Percentiles, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(cache=cache, connect=connect)
+
+    percentiles = await service.calculate_percentiles(
+        params.q, params.group_by, params.method, params.start, params.end
+    )
+
+    return ListPercentilesResponse(
+        percentiles=[PercentileResponse(**row) for row in percentiles]
+    )
+
+
+@router.get('/histograms', response_model=ListHistogramsResponse)
+async def calculate_histograms(
+    params: T_DimensionFilters, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
+
+    histograms = await service.calculate_histograms(
+        params.filters, params.start, params.end
+    )
+
+    return ListHistogramsResponse(
+        histograms=[HistogramResponse(**row) for row in histograms]
+    )
+
+
+@router.get('/trend', response_model=ListTrendResponse)
+async def calculate_trend(
+    params: T_Trend, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
+
+    trend = await service.calculate_trend(
+        params.bucket, params.filters, params.start, params.end
+    )
+
+    return ListTrendResponse(trend=[TrendResponse(**row) for row in trend])
+
+
+@router.get('/hierarchy', response_model=HierarchyResponse)
+async def calculate_hierarchy(
+    params: T_DimensionFilters, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
+
+    tree = await service.calculate_hierarchy(
+        params.filters, params.start, params.end
+    )
+
+    return HierarchyResponse(**tree)
+
+
 @router.get('/answers_location/{location_name}', response_model=CountResponse)
-async def count_answers_by_location(location_name: str, session: T_Database):
-    service = CalculationService(session)
+async def count_answers_by_location(
+    location_name: str, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
 
     count = await service.interviewed_by_location(location_name)
 
     return CountResponse(count=count)
+
+
+@router.get('/answers_location', response_model=ListLocationCountsResponse)
+async def count_answers_by_locations(
+    params: T_Locations, connect: T_ConnectionFactory, cache: T_Cache
+):
+    service = CalculationService(
+        use_rollups=settings.ROLLUPS_ENABLED, cache=cache, connect=connect
+    )
+
+    counts = await service.interviewed_by_locations(params.localidade)
+
+    return ListLocationCountsResponse(
+        locations=[
+            LocationCountResponse(localidade=location, count=count)
+            for location, count in counts.items()
+        ]
+    )
+
+
+@router.get('/breakdown', response_model=ListBreakdownResponse)
+async def calculate_breakdown(params: T_Breakdown, snapshot: T_Snapshot):
+    rows = snapshot.breakdown(
+        params.group_by,
+        params.filters,
+        params.pergunta,
+        params.start,
+        params.end,
+    )
+
+    return ListBreakdownResponse(
+        breakdown=[BreakdownResponse(**row) for row in rows]
+    )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+
+from playground_api.cache import result_cache
+from playground_api.database import async_engine, pool_stats, replica_router
+from playground_api.schemas import CacheStatsResponse, PoolStatsResponse
+
+router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+
+@router.get('/cache', response_model=CacheStatsResponse)
+async def cache_stats():
+    return CacheStatsResponse(**result_cache.stats)
+
+
+@router.get('/pool', response_model=PoolStatsResponse)
+async def database_pool_stats():
+    return PoolStatsResponse(
+        **pool_stats(async_engine), replicas=replica_router.health()
+    )
@@ -1,16 +1,53 @@
+import csv
+import io
 from http import HTTPStatus
+from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 
-from playground_api.custom_types import T_Database, T_Pagination
+from playground_api.cache import check_etag
+from playground_api.custom_types import (
+    T_Cache,
+    T_CacheHeaders,
+    T_Database,
+    T_Pagination,
+)
+from playground_api.pagination import next_cursor
 from playground_api.schemas import (
+    EntrevistadoFlatResponse,
+    ExportFormat,
     ListEntrevistadoFlatResponse,
     ListEntrevistadosResponse,
     ListRespostaResponse,
 )
-from playground_api.services import ResponseService
+from playground_api.services import EXPORT_CHUNK_SIZE, ResponseService
+from playground_api.settings import Settings
+
+settings = Settings()
+
+router = APIRouter(
+    prefix='/responses', tags=['Responses'], dependencies=[Depends(check_etag)]
+)
+
 
-router = APIRouter(prefix='/responses', tags=['Responses'])
+async def _cached_page(cache, key, pagination, build_page):
+    # Only the first pages are cached, a crawl through every page would
+    # otherwise evict the calculation results from the same cache.
+    if (
+        pagination.cursor is not None
+        or pagination.page >= settings.CACHE_MAX_PAGES
+    ):
+        return await build_page()
+
+    # Pages are cached already serialized, so any cache backend can share
+    # them between workers.
+    async def compute():
+        return (await build_page()).model_dump(mode='json')
+
+    return await cache.get_or_compute(
+        f'{key}:{pagination.model_dump_json()}', compute
+    )
 
 
 @router.get(
@@ -18,59 +55,155 @@ router = APIRouter(prefix='/responses', tags=['Responses'])
     response_model=ListEntrevistadosResponse,
     status_code=HTTPStatus.OK,
 )
-async def list_by_interviewed(pagination: T_Pagination, session: T_Database):
-    offset = pagination.page * pagination.limit
-    service = ResponseService(session)
+async def list_by_interviewed(
+    pagination: T_Pagination, session: T_Database, cache: T_Cache
+):
+    async def build_page():
+        service = ResponseService(session)
 
-    entrevistados = await service.get_entrevistados(offset, pagination.limit)
+        entrevistados = await service.get_entrevistados(
+            pagination.offset, pagination.limit, pagination.after_id
+        )
 
-    return ListEntrevistadosResponse(
-        page=pagination.page,
-        limit=pagination.limit,
-        entrevistados=entrevistados,
-    )
+        return ListEntrevistadosResponse(
+            page=pagination.page,
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            next_cursor=next_cursor(entrevistados, pagination.limit),
+            entrevistados=entrevistados,
+        )
+
+    return await _cached_page(cache, 'interviewed', pagination, build_page)
 
 
 @router.get('/question/{question_id}', response_model=ListRespostaResponse)
 async def list_by_question(
-    question_id: int, pagination: T_Pagination, session: T_Database
+    question_id: int,
+    pagination: T_Pagination,
+    session: T_Database,
+    cache: T_Cache,
 ):
-    offset = pagination.page * pagination.limit
-    service = ResponseService(session)
-    respostas = await service.get_pergunta_respostas(
-        offset, pagination.limit, question_id
+    async def build_page():
+        service = ResponseService(session)
+        respostas = await service.get_pergunta_respostas(
+            pagination.offset,
+            pagination.limit,
+            question_id,
+            pagination.after_id,
+        )
+
+        return ListRespostaResponse(
+            page=pagination.page,
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            next_cursor=next_cursor(respostas, pagination.limit),
+            respostas=respostas,
+        )
+
+    return await _cached_page(
+        cache, f'question:{question_id}', pagination, build_page
     )
 
-    return ListRespostaResponse(respostas=respostas)
-
 
 @router.get('/company/{location}', response_model=ListEntrevistadosResponse)
 async def list_by_company_location(
-    location: str, pagination: T_Pagination, session: T_Database
+    location: str,
+    pagination: T_Pagination,
+    session: T_Database,
+    cache: T_Cache,
 ):
-    offset = pagination.page * pagination.limit
-    service = ResponseService(session)
-    entrevistados = await service.get_by_location(
-        offset, pagination.limit, location
-    )
-
-    return ListEntrevistadosResponse(
-        page=pagination.page,
-        limit=pagination.limit,
-        entrevistados=entrevistados,
+    async def build_page():
+        service = ResponseService(session)
+        entrevistados = await service.get_by_location(
+            pagination.offset, pagination.limit, location, pagination.after_id
+        )
+
+        return ListEntrevistadosResponse(
+            page=pagination.page,
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            next_cursor=next_cursor(entrevistados, pagination.limit),
+            entrevistados=entrevistados,
+        )
+
+    return await _cached_page(
+        cache, f'company:{location}', pagination, build_page
     )
 
 
 @router.get('/flat_list')
-async def list_flat(pagination: T_Pagination, session: T_Database):
-    offset = pagination.page * pagination.limit
-    service = ResponseService(session)
-    entrevistados = await service.get_entrevistados_flat_list(
-        offset, pagination.limit
+async def list_flat(
+    pagination: T_Pagination, session: T_Database, cache: T_Cache
+):
+    async def build_page():
+        service = ResponseService(session)
+        entrevistados = await service.get_entrevistados_flat_list(
+            pagination.offset, pagination.limit, pagination.after_id
+        )
+
+        return ListEntrevistadoFlatResponse(
+            page=pagination.page,
+            limit=pagination.limit,
+            cursor=pagination.cursor,
+            next_cursor=next_cursor(entrevistados, pagination.limit),
+            entrevistados=entrevistados,
+        )
+
+    return await _cached_page(cache, 'flat_list', pagination, build_page)
+
+
+async def _ndjson_chunks(entrevistados):
+    lines = []
+    async for entrevistado in entrevistados:
+        lines.append(entrevistado.model_dump_json() + '\n')
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+
+    yield ''.join(lines)
+
+
+async def _csv_chunks(entrevistados):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(
+        buffer, fieldnames=list(EntrevistadoFlatResponse.model_fields)
     )
-
-    return ListEntrevistadoFlatResponse(
-        page=pagination.page,
-        limit=pagination.limit,
-        entrevistados=entrevistados,
+    writer.writeheader()
+    count = 0
+    async for entrevistado in entrevistados:
+        writer.writerow(entrevistado.model_dump())
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+@router.get('/flat_export', response_class=StreamingResponse)
+async def export_flat(
+    session: T_Database,
+    cache_headers: T_CacheHeaders,
+    export_format: Annotated[
+        ExportFormat, Query(alias='format')
+    ] = ExportFormat.NDJSON,
+):
+    service = ResponseService(session)
+    entrevistados = service.stream_entrevistados_flat()
+
+    if export_format == ExportFormat.CSV:
+        return StreamingResponse(
+            _csv_chunks(entrevistados),
+            media_type='text/csv',
+            headers={
+                **cache_headers,
+                'Content-Disposition': 'attachment; filename="flat_list.csv"',
+            },
+        )
+
+    return StreamingResponse(
+        _ndjson_chunks(entrevistados),
+        media_type='application/x-ndjson',
+        headers=cache_headers,
     )
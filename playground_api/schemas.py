@@ -1,11 +1,50 @@
 from datetime import date
+from enum import StrEnum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from playground_api.pagination import decode_cursor
 
 
 class PaginationParams(BaseModel):
     page: int = Field(0, ge=0)
     limit: int = Field(25, gt=0, le=100)
+    cursor: str | None = None
+
+    @field_validator('cursor')
+    @classmethod
+    def validate_cursor(cls, cursor):
+        if cursor is not None:
+            decode_cursor(cursor)
+
+        return cursor
+
+    @property
+    def offset(self):
+        return self.page * self.limit
+
+    @property
+    def after_id(self):
+        if self.cursor is None:
+            return None
+
+        return decode_cursor(self.cursor)
+
+
+class DateRangeParams(BaseModel):
+    start: date | None = None
+    end: date | None = None
+
+    @model_validator(mode='after')
+    def validate_range(self):
+        if self.start and self.end and self.start > self.end:
+            raise ValueError('start must not be after end')
+
+        return self
+
+
+class PaginatedResponse(PaginationParams):
+    next_cursor: str | None = None
 
 
 class EntrevistadoResponse(BaseModel):
@@ -28,21 +67,23 @@ class EntrevistadoResponse(BaseModel):
     respostas: list['RespostaResponse'] | None
 
 
-class ListEntrevistadosResponse(PaginationParams):
+class ListEntrevistadosResponse(PaginatedResponse):
     entrevistados: list[EntrevistadoResponse]
 
 
 class RespostaResponse(BaseModel):
+    id: int
     pergunta: str
     nota: int
     comentario: str
 
 
-class ListRespostaResponse(PaginationParams):
+class ListRespostaResponse(PaginatedResponse):
     respostas: list[RespostaResponse]
 
 
 class EntrevistadoFlatResponse(BaseModel):
+    id: int
     nome: str
     email: str
     email_corporativo: str
@@ -75,22 +116,182 @@ class EntrevistadoFlatResponse(BaseModel):
     comentario_enps: str
 
 
-class ListEntrevistadoFlatResponse(PaginationParams):
+class ListEntrevistadoFlatResponse(PaginatedResponse):
     entrevistados: list[EntrevistadoFlatResponse]
 
 
+class Dimension(StrEnum):
+    GENERO = 'genero'
+    GERACAO = 'geracao'
+    AREA = 'area'
+    CARGO = 'cargo'
+    FUNCAO = 'funcao'
+    LOCALIDADE = 'localidade'
+    TEMPO_EMPRESA = 'tempo_empresa'
+    N0_EMPRESA = 'n0_empresa'
+    N1_DIRETORIA = 'n1_diretoria'
+    N2_GERENCIA = 'n2_gerencia'
+    N3_COORDENACAO = 'n3_coordenacao'
+    N4_AREA = 'n4_area'
+
+
+class PercentileMethod(StrEnum):
+    CONTINUOUS = 'cont'
+    DISCRETE = 'disc'
+
+
+class TrendBucket(StrEnum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    QUARTER = 'quarter'
+
+
+class ExportFormat(StrEnum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
 class NPSResponse(BaseModel):
     nps: float
 
 
 class MedianResponse(BaseModel):
     pergunta: str
-    median: int
+    median: float
 
 
 class ListMediansResponse(BaseModel):
     medians: list[MedianResponse]
 
 
+class PercentileParams(DateRangeParams):
+    q: list[float] = Field([0.25, 0.5, 0.75], min_length=1)
+    group_by: Dimension | None = None
+    method: PercentileMethod = PercentileMethod.CONTINUOUS
+
+    @field_validator('q')
+    @classmethod
+    def validate_quantiles(cls, quantiles):
+        if not all(0 <= quantile <= 1 for quantile in quantiles):
+            raise ValueError('quantiles must be between 0 and 1')
+
+        return quantiles
+
+
+class PercentileResponse(BaseModel):
+    pergunta: str
+    group: str | None = None
+    percentiles: dict[str, float]
+
+
+class ListPercentilesResponse(BaseModel):
+    percentiles: list[PercentileResponse]
+
+
+class DimensionFilterParams(DateRangeParams):
+    genero: str | None = None
+    geracao: str | None = None
+    area: str | None = None
+    cargo: str | None = None
+    funcao: str | None = None
+    localidade: str | None = None
+    tempo_empresa: str | None = None
+    n0_empresa: str | None = None
+    n1_diretoria: str | None = None
+    n2_gerencia: str | None = None
+    n3_coordenacao: str | None = None
+    n4_area: str | None = None
+
+    @property
+    def filters(self):
+        return {
+            dimension.value: getattr(self, dimension.value)
+            for dimension in Dimension
+            if getattr(self, dimension.value) is not None
+        }
+
+
+class BreakdownParams(DimensionFilterParams):
+    group_by: list[Dimension] = Field([], max_length=3)
+    pergunta: str | None = None
+
+
+class BreakdownResponse(BaseModel):
+    pergunta: str
+    group: dict[str, str]
+    count: int
+    mean: float
+    median: float
+    nps: float | None = None
+    distribution: list[int]
+
+
+class ListBreakdownResponse(BaseModel):
+    breakdown: list[BreakdownResponse]
+
+
+class HistogramResponse(BaseModel):
+    pergunta: str
+    count: int
+    distribution: list[int]
+
+
+class ListHistogramsResponse(BaseModel):
+    histograms: list[HistogramResponse]
+
+
+class TrendParams(DimensionFilterParams):
+    bucket: TrendBucket = TrendBucket.MONTH
+
+
+class TrendResponse(BaseModel):
+    period: date
+    nps: float | None = None
+    means: dict[str, float]
+
+
+class ListTrendResponse(BaseModel):
+    trend: list[TrendResponse]
+
+
+class HierarchyResponse(BaseModel):
+    level: Dimension | None = None
+    name: str | None = None
+    respondents: int
+    nps: float | None = None
+    means: dict[str, float]
+    children: list['HierarchyResponse']
+
+
 class CountResponse(BaseModel):
     count: int
+
+
+class LocationCountParams(BaseModel):
+    localidade: list[str] = []
+
+
+class LocationCountResponse(BaseModel):
+    localidade: str
+    count: int
+
+
+class ListLocationCountsResponse(BaseModel):
+    locations: list[LocationCountResponse]
+
+
+class PoolStatsResponse(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    replicas: list[bool]
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    size: int | None
+    version: int | None
@@ -1,273 +1,1038 @@
-import statistics
+from datetime import timedelta
+from functools import partial, wraps
+from itertools import groupby, takewhile
+from math import ceil, floor
+from operator import itemgetter
+from typing import NamedTuple
 
-from sqlalchemy import case, func, select
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import (
+    ColumnElement,
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    Select,
+    bindparam,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased
 
-from playground_api.models import Entrevistado, Pergunta, Resposta
+from playground_api.models import (
+    DEFAULT_PARTITION,
+    DIMENSIONS,
+    MONTHLY_PARTITION,
+    DatasetVersion,
+    Dimensao,
+    Entrevistado,
+    Pergunta,
+    Resposta,
+    RespostaRollup,
+)
 from playground_api.schemas import (
+    Dimension,
     EntrevistadoFlatResponse,
     EntrevistadoResponse,
+    PercentileMethod,
     RespostaResponse,
+    TrendBucket,
+)
+
+EXPORT_CHUNK_SIZE = 1000
+ENPS_QUESTION = 'eNPS'
+MIN_PROMOTER_SCORE = 9
+MAX_DETRACTOR_SCORE = 6
+SCORES = 11
+DATASET_VERSION_ID = 1
+
+PERCENTILE_FUNCTIONS = {
+    PercentileMethod.CONTINUOUS: func.percentile_cont,
+    PercentileMethod.DISCRETE: func.percentile_disc,
+}
+
+ROLLUP_DIMENSIONS = (
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+    'localidade',
+    'area',
+    'geracao',
+    'genero',
+)
+
+HIERARCHY = (
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+)
+
+ANSWERED_KEYS = {
+    'Interesse no Cargo': 'interesse_cargo',
+    'Contribuição': 'contribuicao',
+    'Aprendizado e Desenvolvimento': 'aprendizado_desenvolvimento',
+    'Feedback': 'feedback',
+    'Interação com Gestor': 'interacao_gestor',
+    'Clareza sobre Possibilidades de Carreira': 'clareza_carreira',
+    'Expectativa de Permanência': 'expectativa_permanencia',
+    'eNPS': 'enps',
+}
+
+FLAT_DIMENSIONS = (
+    'area',
+    'cargo',
+    'localidade',
+    'tempo_empresa',
+    'genero',
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+)
+
+DIMENSION_TABLES = {
+    dimension: aliased(Dimensao, name=f'{dimension}_dimensao')
+    for dimension in DIMENSIONS
+}
+
+
+def dimension_column(dimension):
+    return DIMENSION_TABLES[dimension].valor.label(dimension)
+
+
+def join_dimensions(query, dimensions, source=Entrevistado):
+    # The dimension tables are tiny, so looking the labels up by primary
+    # key is cheaper than storing and comparing the repeated strings.
+    for dimension in dimensions:
+        table = DIMENSION_TABLES[dimension]
+        query = query.join(
+            table, table.id == getattr(source, f'{dimension}_fk')
+        )
+
+    return query
+
+
+def dimension_id(dimension, value):
+    return (
+        select(Dimensao.id)
+        .filter(Dimensao.tipo == dimension, Dimensao.valor == value)
+        .scalar_subquery()
+    )
+
+
+ENTREVISTADO_COLUMNS = (
+    Entrevistado.id,
+    Entrevistado.nome,
+    Entrevistado.email,
+    Entrevistado.email_corporativo,
+    *map(dimension_column, DIMENSIONS),
+)
+
+FLAT_ENTREVISTADO_COLUMNS = (
+    Entrevistado.id,
+    Entrevistado.nome,
+    Entrevistado.email,
+    Entrevistado.email_corporativo,
+    *map(dimension_column, FLAT_DIMENSIONS),
 )
 
+RESPOSTA_COLUMNS = (
+    Resposta.id.label('resposta_id'),
+    Pergunta.pergunta,
+    Resposta.nota,
+    Resposta.comentario,
+)
+
+
+def dimension_filters(filters):
+    return [
+        getattr(Entrevistado, f'{dimension}_fk')
+        == dimension_id(dimension, value)
+        for dimension, value in filters.items()
+    ]
+
+
+def date_filters(column, start=None, end=None):
+    # Bounds on the partition key let the planner skip the partitions
+    # (months) outside the range.
+    filters = []
+    if start is not None:
+        filters.append(column >= start)
+    if end is not None:
+        filters.append(column <= end)
+
+    return filters
+
+
+def nps_score(total, promoters, detractors):
+    if not total:
+        return 0
+
+    nps = ((promoters or 0) / total - (detractors or 0) / total) * 100
+    return round(nps, 2)
+
+
+def hierarchy_node(level, name):
+    return {
+        'level': level,
+        'name': name,
+        'respondents': 0,
+        'nps': None,
+        'means': {},
+        'children': [],
+    }
+
+
+def hierarchy_path(row):
+    # ROLLUP leaves the levels below a subtotal empty
+    values = (getattr(row, level) for level in HIERARCHY)
+
+    return tuple(takewhile(lambda value: value is not None, values))
+
+
+def percentile_key(quantile):
+    return f'p{quantile * 100:g}'
+
+
+class PaginatedStatements(NamedTuple):
+    offset: Select
+    keyset: Select
+
+
+def paginated_statements(query, id_column):
+    # Both pagination variants are built once with bound parameters, so
+    # requests reuse the same statements (and SQL text, which psycopg can
+    # prepare on the server) instead of building and compiling new ones.
+    ordered = query.order_by(id_column).limit(
+        bindparam('limit', type_=Integer())
+    )
+
+    return PaginatedStatements(
+        offset=ordered.offset(bindparam('offset', type_=Integer())),
+        keyset=ordered.filter(id_column > bindparam('after_id')),
+    )
+
+
+def entrevistados_statements(*filters):
+    # Paginating the respondents in a subquery keeps LIMIT/OFFSET away
+    # from the joined answers, while a single statement still returns
+    # every column needed to build the responses.
+    pages = paginated_statements(
+        select(Entrevistado.id).filter(*filters), Entrevistado.id
+    )
+
+    return PaginatedStatements(
+        *(
+            join_dimensions(
+                select(*ENTREVISTADO_COLUMNS, *RESPOSTA_COLUMNS).join(
+                    page, page.c.id == Entrevistado.id
+                ),
+                DIMENSIONS,
+            )
+            .outerjoin(Resposta, Resposta.entrevistado_fk == Entrevistado.id)
+            .outerjoin(Pergunta, Pergunta.id == Resposta.pergunta_fk)
+            .order_by(Entrevistado.id, Resposta.id)
+            for page in (query.subquery() for query in pages)
+        )
+    )
+
+
+def flat_entrevistados_query():
+    # Pivots the answers into one wide row per respondent with
+    # conditional aggregates, so the database returns a single row
+    # instead of one row per answered question.
+    answers = []
+    for pergunta, key in ANSWERED_KEYS.items():
+        answered = Pergunta.pergunta == pergunta
+        answers.extend((
+            func.max(Resposta.nota).filter(answered).label(key),
+            func
+            .max(Resposta.comentario)
+            .filter(answered)
+            .label(f'comentario_{key}'),
+        ))
+
+    query = select(
+        *FLAT_ENTREVISTADO_COLUMNS,
+        func.min(Resposta.data).label('data_resposta'),
+        *answers,
+    )
+
+    # Grouping by the dimension keys as well lets the labels be selected,
+    # as they depend on those primary keys.
+    return (
+        join_dimensions(query, FLAT_DIMENSIONS)
+        .join(Resposta, Resposta.entrevistado_fk == Entrevistado.id)
+        .join(Pergunta, Pergunta.id == Resposta.pergunta_fk)
+        .group_by(
+            Entrevistado.id,
+            *(DIMENSION_TABLES[dimension].id for dimension in FLAT_DIMENSIONS),
+        )
+    )
+
+
+ENTREVISTADOS_STATEMENTS = entrevistados_statements()
+LOCATION_STATEMENTS = entrevistados_statements(
+    Entrevistado.localidade_fk
+    == dimension_id('localidade', bindparam('location'))
+)
+PERGUNTA_RESPOSTAS_STATEMENTS = paginated_statements(
+    select(*RESPOSTA_COLUMNS)
+    .join(Resposta.pergunta)
+    .filter(Resposta.pergunta_fk == bindparam('question_id')),
+    Resposta.id,
+)
+FLAT_STATEMENTS = paginated_statements(
+    flat_entrevistados_query(), Entrevistado.id
+)
+FLAT_EXPORT_STATEMENT = flat_entrevistados_query().order_by(Entrevistado.id)
+
 
 class ResponseService:
     def __init__(self, session: AsyncSession):
         self._session = session
 
-    async def _extract_respostas(self, respostas_db):
-        respostas = []
-        for resposta in respostas_db:
-            pergunta = await resposta.awaitable_attrs.pergunta
-            respostas.append(
-                RespostaResponse(
-                    pergunta=pergunta.pergunta,
-                    nota=resposta.nota,
-                    comentario=resposta.comentario,
-                )
-            )
-
-        return respostas
-
-    async def _extract_entrevistado(self, entrevistado):
-        respostas = await entrevistado.awaitable_attrs.respostas
-
-        entrevistado_response = EntrevistadoResponse(
-            id=entrevistado.id,
-            nome=entrevistado.nome,
-            email=entrevistado.email,
-            email_corporativo=entrevistado.email_corporativo,
-            genero=entrevistado.genero,
-            geracao=entrevistado.geracao,
-            area=entrevistado.area,
-            cargo=entrevistado.cargo,
-            funcao=entrevistado.funcao,
-            localidade=entrevistado.localidade,
-            tempo_empresa=entrevistado.tempo_empresa,
-            n0_empresa=entrevistado.n0_empresa,
-            n1_diretoria=entrevistado.n1_diretoria,
-            n2_gerencia=entrevistado.n2_gerencia,
-            n3_coordenacao=entrevistado.n3_coordenacao,
-            n4_area=entrevistado.n4_area,
-            respostas=await self._extract_respostas(respostas),
-        )
-
-        return entrevistado_response
-
-    async def _extract_resposta(self, resposta_db: Resposta):
-        pergunta = await resposta_db.awaitable_attrs.pergunta
+    def _extract_resposta(self, row):
         return RespostaResponse(
-            pergunta=pergunta.pergunta,
-            nota=resposta_db.nota,
-            comentario=resposta_db.comentario,
-        )
-
-    async def _get_response_date(self, entrevistado_db: Entrevistado):
-        respostas = await entrevistado_db.awaitable_attrs.respostas
-
-        return respostas[0].data
-
-    async def _process_answered_questions(self, entrevistado_db: Entrevistado):
-        answered_keys = {
-            'Interesse no Cargo': 'interesse_cargo',
-            'Contribuição': 'contribuicao',
-            'Aprendizado e Desenvolvimento': 'aprendizado_desenvolvimento',
-            'Feedback': 'feedback',
-            'Interação com Gestor': 'interacao_gestor',
-            'Clareza sobre Possibilidades de Carreira': 'clareza_carreira',
-            'Expectativa de Permanência': 'expectativa_permanencia',
-            'eNPS': 'enps',
-        }
-        respostas = await entrevistado_db.awaitable_attrs.respostas
-
-        answered_questions_map = {}
-        for resposta in respostas:
-            pergunta = await resposta.awaitable_attrs.pergunta
-            key = answered_keys.get(pergunta.pergunta)
-            answered_questions_map[key] = resposta.nota
-            answered_questions_map[f'comentario_{key}'] = resposta.comentario
-
-        return answered_questions_map
-
-    async def _extract_flat_entrevistado(self, entrevistado_db: Entrevistado):
-        response_date = await self._get_response_date(entrevistado_db)
-        answered_questions = await self._process_answered_questions(
-            entrevistado_db
-        )
-        return EntrevistadoFlatResponse(
-            id=entrevistado_db.id,
-            nome=entrevistado_db.nome,
-            email=entrevistado_db.email,
-            email_corporativo=entrevistado_db.email_corporativo,
-            genero=entrevistado_db.genero,
-            geracao=entrevistado_db.geracao,
-            area=entrevistado_db.area,
-            cargo=entrevistado_db.cargo,
-            funcao=entrevistado_db.funcao,
-            localidade=entrevistado_db.localidade,
-            tempo_empresa=entrevistado_db.tempo_empresa,
-            n0_empresa=entrevistado_db.n0_empresa,
-            n1_diretoria=entrevistado_db.n1_diretoria,
-            n2_gerencia=entrevistado_db.n2_gerencia,
-            n3_coordenacao=entrevistado_db.n3_coordenacao,
-            n4_area=entrevistado_db.n4_area,
-            data_resposta=response_date,
-            interesse_cargo=answered_questions['interesse_cargo'],
-            comentario_interesse_cargo=answered_questions[
-                'comentario_interesse_cargo'
-            ],
-            contribuicao=answered_questions['contribuicao'],
-            comentario_contribuicao=answered_questions[
-                'comentario_contribuicao'
-            ],
-            aprendizado_desenvolvimento=answered_questions[
-                'aprendizado_desenvolvimento'
-            ],
-            comentario_aprendizado_desenvolvimento=answered_questions[
-                'comentario_aprendizado_desenvolvimento'
-            ],
-            feedback=answered_questions['feedback'],
-            comentario_feedback=answered_questions['comentario_feedback'],
-            interacao_gestor=answered_questions['interacao_gestor'],
-            comentario_interacao_gestor=answered_questions[
-                'comentario_interacao_gestor'
-            ],
-            clareza_carreira=answered_questions['clareza_carreira'],
-            comentario_clareza_carreira=answered_questions[
-                'comentario_clareza_carreira'
-            ],
-            expectativa_permanencia=answered_questions[
-                'expectativa_permanencia'
-            ],
-            comentario_expectativa_permanencia=answered_questions[
-                'comentario_expectativa_permanencia'
-            ],
-            enps=answered_questions['enps'],
-            comentario_enps=answered_questions['comentario_enps'],
+            id=row.resposta_id,
+            pergunta=row.pergunta,
+            nota=row.nota,
+            comentario=row.comentario,
         )
 
-    async def _query_entrevistados(self, offset: int, limit: int):
-        query = select(Entrevistado).options(
-            joinedload(Entrevistado.respostas).joinedload(Resposta.pergunta)
+    def _extract_entrevistado(self, rows):
+        first = rows[0]
+        return EntrevistadoResponse(
+            id=first.id,
+            nome=first.nome,
+            email=first.email,
+            email_corporativo=first.email_corporativo,
+            genero=first.genero,
+            geracao=first.geracao,
+            area=first.area,
+            cargo=first.cargo,
+            funcao=first.funcao,
+            localidade=first.localidade,
+            tempo_empresa=first.tempo_empresa,
+            n0_empresa=first.n0_empresa,
+            n1_diretoria=first.n1_diretoria,
+            n2_gerencia=first.n2_gerencia,
+            n3_coordenacao=first.n3_coordenacao,
+            n4_area=first.n4_area,
+            respostas=[
+                self._extract_resposta(row)
+                for row in rows
+                if row.pergunta is not None
+            ],
         )
-        query = query.offset(offset).limit(limit)
 
-        return (await self._session.scalars(query)).unique().all()
+    def _extract_flat_entrevistado(self, row):
+        return EntrevistadoFlatResponse(**row._mapping)
 
-    async def get_entrevistados(self, offset: int, limit: int):
-        entrevistados = await self._query_entrevistados(offset, limit)
+    def _group_by_entrevistado(self, result):
+        return [list(rows) for _, rows in groupby(result, key=itemgetter(0))]
 
-        entrevistados_response = []
-        for entrevistado in entrevistados:
-            entrevistados_response.append(
-                await self._extract_entrevistado(entrevistado)
-            )
+    def _page(self, statements, offset, limit, after_id, **params):
+        # A cursor seeks past the last seen id through the primary key
+        # index, so deep pages cost the same as the first one. OFFSET is
+        # kept for clients that still paginate by page number.
+        if after_id is not None:
+            return statements.keyset, {
+                **params,
+                'limit': limit,
+                'after_id': after_id,
+            }
+
+        return statements.offset, {**params, 'limit': limit, 'offset': offset}
+
+    async def _query_entrevistados(
+        self, statements, offset: int, limit: int, after_id=None, **params
+    ):
+        query, params = self._page(
+            statements, offset, limit, after_id, **params
+        )
+        result = await self._session.execute(query, params)
+
+        return self._group_by_entrevistado(result)
+
+    async def get_entrevistados(
+        self, offset: int, limit: int, after_id: int | None = None
+    ):
+        entrevistados = await self._query_entrevistados(
+            ENTREVISTADOS_STATEMENTS, offset, limit, after_id
+        )
 
-        return entrevistados_response
+        return [self._extract_entrevistado(rows) for rows in entrevistados]
 
     async def get_pergunta_respostas(
-        self, offset: int, limit: int, question_id: int
+        self,
+        offset: int,
+        limit: int,
+        question_id: int,
+        after_id: int | None = None,
+    ):
+        query, params = self._page(
+            PERGUNTA_RESPOSTAS_STATEMENTS,
+            offset,
+            limit,
+            after_id,
+            question_id=question_id,
+        )
+
+        respostas = await self._session.execute(query, params)
+
+        return [self._extract_resposta(row) for row in respostas]
+
+    async def get_by_location(
+        self,
+        offset: int,
+        limit: int,
+        location: str,
+        after_id: int | None = None,
     ):
-        query = select(Resposta).options(joinedload(Resposta.pergunta))
-        query = query.offset(offset).limit(limit)
-        query = query.filter(Resposta.pergunta_fk == question_id)
+        entrevistados = await self._query_entrevistados(
+            LOCATION_STATEMENTS, offset, limit, after_id, location=location
+        )
+
+        return [self._extract_entrevistado(rows) for rows in entrevistados]
+
+    async def get_entrevistados_flat_list(
+        self, offset: int, limit: int, after_id: int | None = None
+    ):
+        query, params = self._page(FLAT_STATEMENTS, offset, limit, after_id)
 
-        respostas = (await self._session.scalars(query)).unique().all()
+        entrevistados = await self._session.execute(query, params)
+
+        return [self._extract_flat_entrevistado(row) for row in entrevistados]
+
+    async def stream_entrevistados_flat(
+        self, chunk_size: int = EXPORT_CHUNK_SIZE
+    ):
+        # The server side cursor fetches chunk_size rows at a time, so the
+        # memory used by an export doesn't depend on the dataset size.
+        query = FLAT_EXPORT_STATEMENT.execution_options(yield_per=chunk_size)
+        result = await self._session.stream(query)
 
-        respostas_response = []
-        for resposta in respostas:
-            respostas_response.append(await self._extract_resposta(resposta))
+        async for row in result:
+            yield self._extract_flat_entrevistado(row)
 
-        return respostas_response
 
-    async def get_by_location(self, offset: int, limit: int, location: str):
-        query = select(Entrevistado).options(
-            joinedload(Entrevistado.respostas).joinedload(Resposta.pergunta)
+def histogram_percentile(histogram, quantile):
+    # Same interpolation as percentile_cont, walking the (nota, count)
+    # pairs in score order instead of sorting the individual answers.
+    total = sum(count for _, count in histogram)
+    position = quantile * (total - 1)
+    lower_rank, upper_rank = floor(position), ceil(position)
+    lower = None
+    seen = 0
+    for nota, count in histogram:
+        seen += count
+        if lower is None and lower_rank < seen:
+            lower = nota
+        if upper_rank < seen:
+            upper = nota
+            break
+
+    return lower + (upper - lower) * (position - lower_rank)
+
+
+class RollupService:
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def refresh(self, dates=None):
+        # Rebuilds the rollup rows of the given answer dates (or all of them)
+        # from the raw tables, so reloaded days never count twice.
+        # Groups by the dimension keys and only then looks the labels up.
+        dimensions = [
+            getattr(Entrevistado, f'{key}_fk') for key in ROLLUP_DIMENSIONS
+        ]
+        aggregate_query = (
+            select(
+                Resposta.data,
+                Resposta.pergunta_fk,
+                *dimensions,
+                Resposta.nota,
+                func.count().label('total'),
+            )
+            .join(Entrevistado, Entrevistado.id == Resposta.entrevistado_fk)
+            .group_by(
+                Resposta.data, Resposta.pergunta_fk, *dimensions, Resposta.nota
+            )
         )
-        query = query.offset(offset).limit(limit)
-        query = query.filter(Entrevistado.localidade == location)
+        delete_query = delete(RespostaRollup)
+        if dates is not None:
+            aggregate_query = aggregate_query.filter(Resposta.data.in_(dates))
+            delete_query = delete_query.filter(RespostaRollup.data.in_(dates))
 
-        entrevistados = (await self._session.scalars(query)).unique().all()
+        totals = aggregate_query.subquery()
+        totals_query = join_dimensions(
+            select(
+                totals.c.data,
+                totals.c.pergunta_fk,
+                *map(dimension_column, ROLLUP_DIMENSIONS),
+                totals.c.nota,
+                totals.c.total,
+            ).select_from(totals),
+            ROLLUP_DIMENSIONS,
+            totals.c,
+        )
 
-        entrevistados_response = []
-        for entrevistado in entrevistados:
-            entrevistados_response.append(
-                await self._extract_entrevistado(entrevistado)
+        await self._connection.execute(delete_query)
+        await self._connection.execute(
+            insert(RespostaRollup).from_select(
+                ['data', 'pergunta_fk', *ROLLUP_DIMENSIONS, 'nota', 'total'],
+                totals_query,
             )
+        )
+
+
+def month_bounds(day):
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+
+    return start, end
 
-        return entrevistados_response
 
-    async def get_entrevistados_flat_list(self, offset: int, limit: int):
-        entrevistados_db = await self._query_entrevistados(offset, limit)
-        entrevistados = []
-        for entrevistado in entrevistados_db:
-            entrevistados.append(
-                await self._extract_flat_entrevistado(entrevistado)
+class PartitionService:
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def existing(self):
+        query = text(
+            'SELECT inhrelid::regclass::text FROM pg_inherits '
+            "WHERE inhparent = 'respostas'::regclass"
+        )
+
+        return set((await self._connection.execute(query)).scalars())
+
+    async def create(self, day):
+        # Attaching a table takes a SHARE UPDATE EXCLUSIVE lock on respostas,
+        # so it doesn't wait for the open import transactions like CREATE
+        # TABLE ... PARTITION OF would. The default partition is still
+        # locked ACCESS EXCLUSIVE while it is checked for rows of the month.
+        start, end = month_bounds(day)
+        name = MONTHLY_PARTITION.format(start)
+        bounds = {'start': start, 'end': end}
+        # Importers creating the same month wait for each other, and the
+        # later ones find the partition attached.
+        await self._connection.execute(
+            text('SELECT pg_advisory_xact_lock(hashtext(:name))'),
+            {'name': name},
+        )
+        if name in await self.existing():
+            return name
+
+        # A table left by DETACH PARTITION is attached back
+        await self._connection.execute(
+            text(f'CREATE TABLE IF NOT EXISTS {name} (LIKE respostas)')
+        )
+        # Answers written for the month before it had a partition would
+        # make the attach fail, so they move to the new partition.
+        await self._connection.execute(
+            text(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                'WHERE data >= :start AND data < :end RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved'
+            ),
+            bounds,
+        )
+        await self._connection.execute(
+            text(
+                f'ALTER TABLE respostas ATTACH PARTITION {name} '
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        )
+
+        return name
+
+
+class DatasetVersionService:
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def get(self):
+        query = select(DatasetVersion.version).filter(
+            DatasetVersion.id == DATASET_VERSION_ID
+        )
+
+        return await self._connection.scalar(query) or 0
+
+    async def bump(self):
+        statement = pg_insert(DatasetVersion).values(
+            id=DATASET_VERSION_ID, version=1
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[DatasetVersion.id],
+            set_={
+                'version': DatasetVersion.version + 1,
+                'updated_at': func.now(),
+            },
+        )
+
+        await self._connection.execute(statement)
+
+
+class AnswerSource(NamedTuple):
+    table: type
+    answers: ColumnElement
+    scores: ColumnElement
+    conditions: list
+
+    def column(self, dimension):
+        if self.table is Resposta:
+            return DIMENSION_TABLES[dimension].valor
+
+        return getattr(self.table, dimension)
+
+    def query(self, *columns, dimensions=(), start=None, end=None):
+        query = (
+            select(*columns)
+            .select_from(self.table)
+            .join(Pergunta, Pergunta.id == self.table.pergunta_fk)
+            .filter(
+                *self.conditions,
+                *date_filters(self.table.data, start, end),
+            )
+        )
+        if self.table is Resposta and (self.conditions or dimensions):
+            query = join_dimensions(
+                query.join(
+                    Entrevistado, Entrevistado.id == Resposta.entrevistado_fk
+                ),
+                dimensions,
             )
 
-        return entrevistados
+        return query
+
+
+def cached(method):
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if self._cache is None:
+            return await method(self, *args, **kwargs)
+
+        key = f'{method.__name__}:{self._use_rollups}:{args!r}:{kwargs!r}'
+
+        return await self._cache.get_or_compute(
+            key, partial(method, self, *args, **kwargs)
+        )
+
+    return wrapper
 
 
 class CalculationService:
-    def __init__(self, session):
+    def __init__(
+        self, session=None, use_rollups=False, cache=None, connect=None
+    ):
         self._session = session
+        self._use_rollups = use_rollups
+        self._cache = cache
+        self._connect = connect
 
-    async def calculate_nps(self):
-        # Performing Database Calculation
-        min_promoters = 9
-        max_detractors = 6
-        promoter_calc = case((Resposta.nota >= min_promoters, 1))
-        detractor_calc = case((Resposta.nota <= max_detractors, 1))
+    async def _get_session(self):
+        # The routes pass a connect factory instead of a connection, so
+        # results served from the cache never check one out of the pool.
+        if self._session is None:
+            self._session = await self._connect()
 
-        query = select(
-            func.count(Resposta.id).label('total'),
-            func.count(promoter_calc).label('promoters'),
-            func.count(detractor_calc).label('detractors'),
-        ).filter(Pergunta.pergunta == 'eNPS')
+        return self._session
 
-        result = (await self._session.execute(query)).one()
+    @cached
+    async def calculate_nps(self, start=None, end=None):
+        # Performing Database Calculation
+        if self._use_rollups:
+            source = RespostaRollup
+            answers = func.sum(RespostaRollup.total)
+        else:
+            source = Resposta
+            answers = func.count()
+        query = (
+            select(
+                answers.label('total'),
+                answers.filter(source.nota >= MIN_PROMOTER_SCORE).label(
+                    'promoters'
+                ),
+                answers.filter(source.nota <= MAX_DETRACTOR_SCORE).label(
+                    'detractors'
+                ),
+            )
+            .select_from(source)
+            .join(Pergunta, Pergunta.id == source.pergunta_fk)
+            .filter(
+                Pergunta.pergunta == ENPS_QUESTION,
+                *date_filters(source.data, start, end),
+            )
+        )
 
-        if result.total == 0:
-            return 0
+        result = (await (await self._get_session()).execute(query)).one()
 
-        nps = (
-            (result.promoters / result.total)
-            - (result.detractors / result.total)
-        ) * 100
-        return round(nps, 2)
+        return nps_score(result.total, result.promoters, result.detractors)
 
-    async def calculate_medians(self):
-        query = select(Pergunta).options(joinedload(Pergunta.respostas))
-        query = query.filter(Pergunta.pergunta != 'eNPS')
+    async def _query_percentiles(self, quantiles, group_by, method, *filters):
+        # A single ordered-set aggregate over an array of fractions sorts
+        # each group once, whatever the number of requested quantiles.
+        percentile_function = PERCENTILE_FUNCTIONS[method]
+        columns = [Pergunta.pergunta]
+        if group_by is not None:
+            columns.append(DIMENSION_TABLES[group_by].valor.label('group'))
 
-        perguntas = (await self._session.scalars(query)).unique().all()
+        query = (
+            select(
+                *columns,
+                percentile_function(array(quantiles, type_=Float()))
+                .within_group(Resposta.nota)
+                .label('percentiles'),
+            )
+            .select_from(Resposta)
+            .join(Pergunta, Pergunta.id == Resposta.pergunta_fk)
+            .filter(*filters)
+            .group_by(*columns)
+            .order_by(*columns)
+        )
+        if group_by is not None:
+            query = join_dimensions(
+                query.join(
+                    Entrevistado, Entrevistado.id == Resposta.entrevistado_fk
+                ),
+                [group_by],
+            )
 
-        medians = {}
+        return (await (await self._get_session()).execute(query)).all()
 
-        for pergunta in perguntas:
-            respostas = await pergunta.awaitable_attrs.respostas
-            medians[pergunta.pergunta] = statistics.median([
-                r.nota for r in respostas
-            ])
+    @cached
+    async def calculate_percentiles(
+        self,
+        quantiles: list[float],
+        group_by: Dimension | None = None,
+        method: PercentileMethod = PercentileMethod.CONTINUOUS,
+        start=None,
+        end=None,
+    ):
+        rows = await self._query_percentiles(
+            quantiles,
+            group_by,
+            method,
+            *date_filters(Resposta.data, start, end),
+        )
+        keys = [percentile_key(quantile) for quantile in quantiles]
 
-        return medians
+        return [
+            {
+                'pergunta': row.pergunta,
+                'group': row.group if group_by is not None else None,
+                'percentiles': dict(zip(keys, row.percentiles)),
+            }
+            for row in rows
+        ]
 
-    async def interviewed_by_location(self, location):
-        # Performing Database Calculation
+    async def _rollup_medians(self, start, end):
         query = (
             select(
-                Entrevistado.localidade,
-                func.count(Entrevistado.localidade).label('count'),
+                Pergunta.pergunta,
+                RespostaRollup.nota,
+                func.sum(RespostaRollup.total).label('total'),
+            )
+            .select_from(RespostaRollup)
+            .join(Pergunta, Pergunta.id == RespostaRollup.pergunta_fk)
+            .filter(
+                Pergunta.pergunta != ENPS_QUESTION,
+                *date_filters(RespostaRollup.data, start, end),
+            )
+            .group_by(Pergunta.pergunta, RespostaRollup.nota)
+            .order_by(Pergunta.pergunta, RespostaRollup.nota)
+        )
+        rows = (await (await self._get_session()).execute(query)).all()
+
+        return {
+            pergunta: histogram_percentile(
+                [(row.nota, row.total) for row in histogram], 0.5
+            )
+            for pergunta, histogram in groupby(rows, key=itemgetter(0))
+        }
+
+    @cached
+    async def calculate_medians(self, start=None, end=None):
+        if self._use_rollups:
+            return await self._rollup_medians(start, end)
+
+        rows = await self._query_percentiles(
+            [0.5],
+            None,
+            PercentileMethod.CONTINUOUS,
+            Pergunta.pergunta != ENPS_QUESTION,
+            *date_filters(Resposta.data, start, end),
+        )
+
+        return {row.pergunta: row.percentiles[0] for row in rows}
+
+    def _answer_source(self, filters):
+        # Answers filtered only by the dimensions kept in the rollups are
+        # already counted per score there.
+        if self._use_rollups and set(filters) <= set(ROLLUP_DIMENSIONS):
+            return AnswerSource(
+                RespostaRollup,
+                func.sum(RespostaRollup.total),
+                func.sum(RespostaRollup.nota * RespostaRollup.total),
+                [
+                    getattr(RespostaRollup, dimension) == value
+                    for dimension, value in filters.items()
+                ],
+            )
+
+        return AnswerSource(
+            Resposta,
+            func.count(),
+            func.sum(Resposta.nota),
+            dimension_filters(filters),
+        )
+
+    @cached
+    async def calculate_histograms(self, filters=None, start=None, end=None):
+        source = self._answer_source(filters or {})
+        query = (
+            source
+            .query(
+                Pergunta.pergunta,
+                source.table.nota,
+                source.answers.label('total'),
+                start=start,
+                end=end,
+            )
+            # Scores outside the distribution are left out, the importer
+            # rejects them but the table does not.
+            .filter(source.table.nota.between(0, SCORES - 1))
+            .group_by(Pergunta.pergunta, source.table.nota)
+            .order_by(Pergunta.pergunta, source.table.nota)
+        )
+        rows = (await (await self._get_session()).execute(query)).all()
+
+        histograms = []
+        for pergunta, scores in groupby(rows, key=itemgetter(0)):
+            distribution = [0] * SCORES
+            for row in scores:
+                distribution[row.nota] = row.total
+            histograms.append({
+                'pergunta': pergunta,
+                'count': sum(distribution),
+                'distribution': distribution,
+            })
+
+        return histograms
+
+    @cached
+    async def calculate_trend(
+        self,
+        bucket: TrendBucket = TrendBucket.MONTH,
+        filters=None,
+        start=None,
+        end=None,
+    ):
+        source = self._answer_source(filters or {})
+        table = source.table
+        # The bucket is rendered inline, as the grouped expression must be
+        # the same one selected.
+        period = cast(
+            func.date_trunc(
+                literal(bucket.value, literal_execute=True),
+                cast(table.data, DateTime()),
+            ),
+            Date(),
+        ).label('period')
+        query = (
+            source
+            .query(
+                period,
+                Pergunta.pergunta,
+                source.answers.label('total'),
+                source.scores.label('scores'),
+                source.answers.filter(table.nota >= MIN_PROMOTER_SCORE).label(
+                    'promoters'
+                ),
+                source.answers.filter(table.nota <= MAX_DETRACTOR_SCORE).label(
+                    'detractors'
+                ),
+                start=start,
+                end=end,
+            )
+            .group_by(period, Pergunta.pergunta)
+            .order_by(period, Pergunta.pergunta)
+        )
+        rows = (await (await self._get_session()).execute(query)).all()
+
+        trend = []
+        for day, questions in groupby(rows, key=itemgetter(0)):
+            point = {'period': day.isoformat(), 'nps': None, 'means': {}}
+            for row in questions:
+                if row.pergunta == ENPS_QUESTION:
+                    point['nps'] = nps_score(
+                        row.total, row.promoters, row.detractors
+                    )
+                else:
+                    point['means'][row.pergunta] = round(
+                        row.scores / row.total, 2
+                    )
+            trend.append(point)
+
+        return trend
+
+    @cached
+    async def calculate_hierarchy(self, filters=None, start=None, end=None):
+        source = self._answer_source(filters or {})
+        table = source.table
+        levels = [source.column(level) for level in HIERARCHY]
+        # One pass computes every node: ROLLUP adds the subtotals of each
+        # hierarchy prefix, down to the whole company, per question.
+        query = source.query(
+            Pergunta.pergunta,
+            *(column.label(level) for column, level in zip(levels, HIERARCHY)),
+            source.answers.label('total'),
+            source.scores.label('scores'),
+            source.answers.filter(table.nota >= MIN_PROMOTER_SCORE).label(
+                'promoters'
+            ),
+            source.answers.filter(table.nota <= MAX_DETRACTOR_SCORE).label(
+                'detractors'
+            ),
+            dimensions=HIERARCHY,
+            start=start,
+            end=end,
+        ).group_by(Pergunta.pergunta, func.rollup(*levels))
+        rows = (await (await self._get_session()).execute(query)).all()
+        respondents = await self._hierarchy_respondents(filters, start, end)
+
+        nodes = {(): hierarchy_node(None, None)}
+        for row in rows:
+            path = hierarchy_path(row)
+            if path not in nodes:
+                nodes[path] = hierarchy_node(
+                    HIERARCHY[len(path) - 1], path[-1]
+                )
+            node = nodes[path]
+            if row.pergunta == ENPS_QUESTION:
+                node['nps'] = nps_score(
+                    row.total, row.promoters, row.detractors
+                )
+            else:
+                node['means'][row.pergunta] = round(row.scores / row.total, 2)
+
+        for path, node in nodes.items():
+            node['respondents'] = respondents.get(path, 0)
+        for path in sorted(nodes)[1:]:
+            nodes[path[:-1]]['children'].append(nodes[path])
+
+        return nodes[()]
+
+    async def _hierarchy_respondents(self, filters, start, end):
+        # The answers are grouped per question, so the respondents of each
+        # node are counted from their own table instead.
+        levels = [dimension_column(level) for level in HIERARCHY]
+        query = (
+            join_dimensions(
+                select(*levels, func.count().label('respondents')).select_from(
+                    Entrevistado
+                ),
+                HIERARCHY,
+            )
+            .filter(
+                *dimension_filters(filters or {}),
+                *date_filters(Entrevistado.data_resposta, start, end),
             )
-            .group_by(Entrevistado.localidade)
-            .order_by(func.count(Entrevistado.localidade).desc())
-        ).filter(Entrevistado.localidade == location)
+            .group_by(func.rollup(*levels))
+        )
+        rows = (await (await self._get_session()).execute(query)).all()
+
+        return {hierarchy_path(row): row.respondents for row in rows}
+
+    async def _rollup_interviewed_by_location(self, location):
+        # Every respondent answers each question once, so the busiest
+        # question of the location counts its respondents.
+        answers = (
+            select(func.sum(RespostaRollup.total).label('total'))
+            .filter(RespostaRollup.localidade == location)
+            .group_by(RespostaRollup.pergunta_fk)
+            .subquery()
+        )
+        query = select(func.coalesce(func.max(answers.c.total), 0))
+
+        return await (await self._get_session()).scalar(query)
+
+    async def _rollup_interviewed_by_locations(self, locations):
+        answers = select(
+            RespostaRollup.localidade,
+            func.sum(RespostaRollup.total).label('total'),
+        ).group_by(RespostaRollup.localidade, RespostaRollup.pergunta_fk)
+        if locations:
+            answers = answers.filter(RespostaRollup.localidade.in_(locations))
+        answers = answers.subquery()
+        query = (
+            select(answers.c.localidade, func.max(answers.c.total))
+            .group_by(answers.c.localidade)
+            .order_by(answers.c.localidade)
+        )
 
-        try:
-            result = (await self._session.execute(query)).one()
-        except NoResultFound:
-            return 0
+        return (await (await self._get_session()).execute(query)).all()
+
+    async def _interviewed_by_locations(self, locations):
+        # Counts by key in one grouped scan and only then looks the labels up
+        respondents = select(
+            Entrevistado.localidade_fk, func.count().label('total')
+        ).group_by(Entrevistado.localidade_fk)
+        if locations:
+            respondents = respondents.filter(
+                Entrevistado.localidade_fk.in_(
+                    select(Dimensao.id).filter(
+                        Dimensao.tipo == 'localidade',
+                        Dimensao.valor.in_(locations),
+                    )
+                )
+            )
+        respondents = respondents.subquery()
+        query = join_dimensions(
+            select(dimension_column('localidade'), respondents.c.total)
+            .select_from(respondents)
+            .order_by(dimension_column('localidade')),
+            ['localidade'],
+            respondents.c,
+        )
+
+        return (await (await self._get_session()).execute(query)).all()
+
+    @cached
+    async def interviewed_by_locations(self, locations=None):
+        if self._use_rollups:
+            rows = await self._rollup_interviewed_by_locations(locations)
+        else:
+            rows = await self._interviewed_by_locations(locations)
+
+        counts = dict(rows)
+        if locations:
+            return {
+                location: counts.get(location, 0) for location in locations
+            }
+
+        return counts
+
+    @cached
+    async def interviewed_by_location(self, location):
+        if self._use_rollups:
+            return await self._rollup_interviewed_by_location(location)
+
+        # Performing Database Calculation
+        query = select(func.count()).filter(
+            Entrevistado.localidade_fk == dimension_id('localidade', location)
+        )
 
-        return result.count
+        return await (await self._get_session()).scalar(query)
@@ -7,3 +7,21 @@ class Settings(BaseSettings):
     )
     VERSION: str = '1.0.0'
     DATABASE_URL: str
+    ROLLUPS_ENABLED: bool = False
+    CACHE_URL: str | None = None
+    CACHE_MAX_ENTRIES: int = 256
+    CACHE_TTL_SECONDS: float = 60.0
+    CACHE_VERSION_CHECK_SECONDS: float = 5.0
+    CACHE_LOCK_SECONDS: float = 30.0
+    CACHE_LOCK_POLL_SECONDS: float = 0.05
+    CACHE_MAX_PAGES: int = 5
+    HTTP_CACHE_MAX_AGE: int = 30
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int | None = None
+    DB_PREPARE_THRESHOLD: int | None = 1
+    REPLICA_URLS: list[str] = []
+    REPLICA_RETRY_SECONDS: float = 30.0
@@ -1,134 +1,780 @@
+import argparse
 import asyncio
+import hashlib
+import io
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from csv import DictReader
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import batched
+from pathlib import Path
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
-from playground_api.database import async_engine
-from playground_api.models import Entrevistado, Pergunta, Resposta
+from playground_api.database import engine_options
+from playground_api.models import (
+    DIMENSIONS,
+    MONTHLY_PARTITION,
+    Dimensao,
+    Entrevistado,
+    Pergunta,
+    Resposta,
+)
+from playground_api.services import (
+    DatasetVersionService,
+    PartitionService,
+    RollupService,
+)
+from playground_api.settings import Settings
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WRITERS = 4
+MIN_SCORE = 0
+MAX_SCORE = 10
+MAX_REPORTED_ERRORS = 10
+RESPONDENT_KEY = 'uq_entrevistados_email_corporativo_data_resposta'
+
+ANSWER_KEYS = [
+    ('Interesse no Cargo', 'Comentários - Interesse no Cargo'),
+    ('Contribuição', 'Comentários - Contribuição'),
+    (
+        'Aprendizado e Desenvolvimento',
+        'Comentários - Aprendizado e Desenvolvimento',
+    ),
+    ('Feedback', 'Comentários - Feedback'),
+    ('Interação com Gestor', 'Comentários - Interação com Gestor'),
+    (
+        'Clareza sobre Possibilidades de Carreira',
+        'Comentários - Clareza sobre Possibilidades de Carreira',
+    ),
+    (
+        'Expectativa de Permanência',
+        'Comentários - Expectativa de Permanência',
+    ),
+    ('eNPS', '[Aberta] eNPS'),
+]
+
+INTERVIEWED_KEYS = [
+    ('nome', 'nome'),
+    ('email', 'email'),
+    ('email_corporativo', 'email_corporativo'),
+    ('genero', 'genero'),
+    ('geracao', 'geracao'),
+    ('area', 'area'),
+    ('cargo', 'cargo'),
+    ('funcao', 'funcao'),
+    ('localidade', 'localidade'),
+    ('tempo_empresa', 'tempo_de_empresa'),
+    ('n0_empresa', 'n0_empresa'),
+    ('n1_diretoria', 'n1_diretoria'),
+    ('n2_gerencia', 'n2_gerencia'),
+    ('n3_coordenacao', 'n3_coordenacao'),
+    ('n4_area', 'n4_area'),
+]
+
+UPSERT_COLUMNS = [
+    *(
+        f'{column}_fk' if column in DIMENSIONS else column
+        for column, _ in INTERVIEWED_KEYS
+        if column != 'email_corporativo'
+    ),
+    'row_hash',
+]
+
+HASHED_KEYS = [
+    *(csv_key for _, csv_key in INTERVIEWED_KEYS),
+    'Data da Resposta',
+    *(key for answer_keys in ANSWER_KEYS for key in answer_keys),
+]
+
+COPY_RESPOSTAS = (
+    'COPY respostas (data, nota, comentario, pergunta_fk, entrevistado_fk) '
+    'FROM STDIN'
+)
+
+settings = Settings()
+
+# COPY, the rollup refresh and the partition DDL can run longer than the
+# API statement timeout, so the importer has its own engine without it.
+async_engine = create_async_engine(
+    settings.DATABASE_URL, **engine_options(settings, limit_statements=False)
+)
+
+
+class AlreadyImportedError(Exception):
+    pass
+
+
+@contextmanager
+def reject_imported_rows():
+    # Only the incremental mode updates respondents that are already in the
+    # database, the other modes stop at the first one.
+    try:
+        yield
+    except IntegrityError as exc:
+        if exc.orig.diag.constraint_name != RESPONDENT_KEY:
+            raise
+
+        raise AlreadyImportedError(
+            'respondents already imported, use --incremental to update them'
+        ) from exc
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    return datetime.strptime(value, '%d/%m/%Y').date()
+
+
+@dataclass(slots=True)
+class ParsedRow:
+    interviewed: dict
+    response_date: date
+    answers: list[tuple[str, int, str]]
+
+
+def iter_csv_rows(csv_path):
+    with open(csv_path, encoding='utf-8') as csv_file:
+        reader = DictReader(csv_file, delimiter=';')
+        for row in reader:
+            yield reader.line_num, row
+
+
+def interviewed_values(answer_data):
+    return {
+        column: answer_data[csv_key] for column, csv_key in INTERVIEWED_KEYS
+    }
+
+
+def row_hash(answer_data):
+    digest = hashlib.sha256()
+    for csv_key in HASHED_KEYS:
+        digest.update(answer_data[csv_key].encode())
+        digest.update(b'\x1f')
+
+    return digest.hexdigest()
+
+
+def parse_score(value):
+    score = int(value)
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        raise ValueError(f'score {score} out of range')
+
+    return score
+
+
+def parse_row(answer_data):
+    # DictReader fills the fields missing from a short row with None
+    missing = [key for key, value in answer_data.items() if value is None]
+    if missing:
+        raise ValueError(f'missing fields: {", ".join(missing)}')
+
+    response_date = parse_date(answer_data['Data da Resposta'])
+    interviewed = interviewed_values(answer_data)
+    interviewed['data_resposta'] = response_date
+    interviewed['row_hash'] = row_hash(answer_data)
+
+    return ParsedRow(
+        interviewed=interviewed,
+        response_date=response_date,
+        answers=[
+            (
+                question_key,
+                parse_score(answer_data[question_key]),
+                answer_data[comment_key],
+            )
+            for question_key, comment_key in ANSWER_KEYS
+        ],
+    )
+
+
+def parse_rows(csv_path, rows):
+    parsed_rows = []
+    errors = []
+    for line_num, answer_data in rows:
+        try:
+            parsed_rows.append(parse_row(answer_data))
+        except (KeyError, TypeError, ValueError) as exc:
+            errors.append(f'{csv_path}:{line_num}: {exc!r}')
+
+    return parsed_rows, errors
+
+
+def csv_chunks(csv_path, batch_size):
+    # Only the line boundaries are found here; the rows are read, tokenized
+    # and validated by parse_chunk, in the worker processes.
+    with open(csv_path, 'rb') as csv_file:
+        start = len(csv_file.readline())
+        line_num = 2
+        for lines in batched(csv_file, batch_size):
+            size = sum(map(len, lines))
+            yield start, size, line_num
+            start += size
+            line_num += len(lines)
+
+
+def parse_chunk(csv_path, start, size, line_num):
+    with open(csv_path, 'rb') as csv_file:
+        header = csv_file.readline()
+        csv_file.seek(start)
+        data = csv_file.read(size)
+
+    reader = DictReader(
+        io.StringIO((header + data).decode('utf-8'), newline=''),
+        delimiter=';',
+    )
+    # The reader counts the header as its first line
+    rows = ((line_num + reader.line_num - 2, row) for row in reader)
+
+    return parse_rows(csv_path, rows)
+
+
+def expand_csv_paths(paths):
+    csv_paths = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            csv_paths.extend(sorted(path.glob('*.csv')))
+        else:
+            csv_paths.append(path)
+
+    return csv_paths
 
 
 class DataCSVPopulator:
-    def __init__(self):
-        self._data = []
+    def __init__(self, csv_paths=('data.csv',)):
+        self._csv_paths = expand_csv_paths(csv_paths)
         self._empresa = None
-        self._perguntas = []
+        self._perguntas = {}
+        self._dimensoes = {}
+        self._dimension_ids = {}
+        self._partitions = set()
+        self._partition_lock = asyncio.Lock()
+        self._errors = []
+        self._count = 0
+        self._stats = Counter()
+        self._dates = set()
+        self._incremental = False
+        self._pool = None
         self._load_questions()
 
-    def _read_csv_data(self):
-        self._data = []
-        with open('data.csv', encoding='utf-8') as csv_file:
-            for row in DictReader(csv_file, delimiter=';'):
-                self._data.append(row)
-
-    def _extract_interviewed(self, answer_data):
-        interviewed = Entrevistado(
-            nome=answer_data['nome'],
-            email=answer_data['email'],
-            email_corporativo=answer_data['email_corporativo'],
-            genero=answer_data['genero'],
-            geracao=answer_data['geracao'],
-            area=answer_data['area'],
-            cargo=answer_data['cargo'],
-            funcao=answer_data['funcao'],
-            localidade=answer_data['localidade'],
-            tempo_empresa=answer_data['tempo_de_empresa'],
-            n0_empresa=answer_data['n0_empresa'],
-            n1_diretoria=answer_data['n1_diretoria'],
-            n2_gerencia=answer_data['n2_gerencia'],
-            n3_coordenacao=answer_data['n3_coordenacao'],
-            n4_area=answer_data['n4_area'],
+    def _iter_parsed_rows(self):
+        for csv_path in self._csv_paths:
+            for line_num, answer_data in iter_csv_rows(csv_path):
+                parsed_rows, errors = parse_rows(
+                    csv_path, [(line_num, answer_data)]
+                )
+                self._errors.extend(errors)
+                yield from parsed_rows
+
+    def _load_questions(self):
+        for question_key, _ in ANSWER_KEYS:
+            self._perguntas[question_key] = Pergunta(question_key)
+
+    async def _load_perguntas(self):
+        # The answers reference the stored questions instead of inserting
+        # them again on every import.
+        async with async_engine.connect() as conn:
+            await self._ensure_questions(conn)
+            await conn.commit()
+        async with AsyncSession(
+            async_engine, expire_on_commit=False
+        ) as session:
+            perguntas = await session.scalars(
+                select(Pergunta).where(Pergunta.pergunta.in_(self._perguntas))
+            )
+            self._perguntas.update(
+                (pergunta.pergunta, pergunta) for pergunta in perguntas
+            )
+
+    def _get_pergunta(self, question):
+        return self._perguntas.get(question)
+
+    async def _load_dimensoes(self):
+        async with AsyncSession(
+            async_engine, expire_on_commit=False
+        ) as session:
+            dimensoes = await session.scalars(select(Dimensao))
+            self._dimensoes.update(
+                ((dimensao.tipo, dimensao.valor), dimensao)
+                for dimensao in dimensoes
+            )
+
+    def _get_dimensao(self, tipo, valor):
+        dimensao = self._dimensoes.get((tipo, valor))
+        if dimensao is None:
+            dimensao = self._dimensoes[tipo, valor] = Dimensao(tipo, valor)
+
+        return dimensao
+
+    def _extract_models(self, parsed_row):
+        values = dict(parsed_row.interviewed)
+        for dimension in DIMENSIONS:
+            values[f'{dimension}_dimensao'] = self._get_dimensao(
+                dimension, values.pop(dimension)
+            )
+        interviewed = Entrevistado(**values)
+        answers = [
+            Resposta(
+                data=parsed_row.response_date,
+                nota=nota,
+                comentario=comentario,
+                pergunta=self._get_pergunta(question_key),
+                entrevistado=interviewed,
+            )
+            for question_key, nota, comentario in parsed_row.answers
+        ]
+
+        return interviewed, answers
+
+    def _iter_models(self, batch_size):
+        for parsed_rows in batched(self._iter_parsed_rows(), batch_size):
+            models = []
+            for parsed_row in parsed_rows:
+                interviewed, answers = self._extract_models(parsed_row)
+                models.append(interviewed)
+                models.extend(answers)
+
+            yield models
+
+    async def _ensure_questions(self, conn):
+        names = list(self._perguntas)
+        query = select(Pergunta.pergunta, Pergunta.id).where(
+            Pergunta.pergunta.in_(names)
         )
+        question_ids = dict((await conn.execute(query)).tuples().all())
+
+        missing = [{'pergunta': n} for n in names if n not in question_ids]
+        if missing:
+            result = await conn.execute(
+                insert(Pergunta).returning(Pergunta.pergunta, Pergunta.id),
+                missing,
+            )
+            question_ids.update(result.tuples().all())
 
-        return interviewed
+        return question_ids
 
-    def _load_questions(self):
-        self._perguntas.append(Pergunta('Interesse no Cargo'))
-        self._perguntas.append(Pergunta('Contribuição'))
-        self._perguntas.append(Pergunta('Aprendizado e Desenvolvimento'))
-        self._perguntas.append(Pergunta('Feedback'))
-        self._perguntas.append(Pergunta('Interação com Gestor'))
-        self._perguntas.append(
-            Pergunta('Clareza sobre Possibilidades de Carreira')
+    async def _resolve_dimensions(self, rows):
+        # Known values come from the in-memory cache, so only the batches
+        # that see a new value reach the dimension table. New values are
+        # committed on their own, as other writers may reference them
+        # before this batch commits, and sorting the keys keeps concurrent
+        # writers from deadlocking on them.
+        missing = sorted(
+            {
+                (dimension, row.interviewed[dimension])
+                for row in rows
+                for dimension in DIMENSIONS
+            }
+            - self._dimension_ids.keys()
         )
-        self._perguntas.append(Pergunta('Expectativa de Permanência'))
-        self._perguntas.append(Pergunta('eNPS'))
+        if not missing:
+            return
 
-    def _get_pergunta(self, question):
-        for pergunta in self._perguntas:
-            if pergunta.pergunta == question:
-                return pergunta
+        statement = pg_insert(Dimensao).on_conflict_do_nothing(
+            constraint='uq_dimensoes_tipo_valor'
+        )
+        query = select(Dimensao.tipo, Dimensao.valor, Dimensao.id).where(
+            tuple_(Dimensao.tipo, Dimensao.valor).in_(missing)
+        )
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                statement,
+                [{'tipo': tipo, 'valor': valor} for tipo, valor in missing],
+            )
+            result = await conn.execute(query)
 
-        return None
+        self._dimension_ids.update(
+            ((tipo, valor), dimensao_id)
+            for tipo, valor, dimensao_id in result.tuples()
+        )
 
-    def _extract_answers(self, answer_data, interviewed):
-        answer_keys = [
-            ('Interesse no Cargo', 'Comentários - Interesse no Cargo'),
-            ('Contribuição', 'Comentários - Contribuição'),
-            (
-                'Aprendizado e Desenvolvimento',
-                'Comentários - Aprendizado e Desenvolvimento',
-            ),
-            ('Feedback', 'Comentários - Feedback'),
-            ('Interação com Gestor', 'Comentários - Interação com Gestor'),
-            (
-                'Clareza sobre Possibilidades de Carreira',
-                'Comentários - Clareza sobre Possibilidades de Carreira',
-            ),
-            (
-                'Expectativa de Permanência',
-                'Comentários - Expectativa de Permanência',
+    def _dimension_keys(self, interviewed):
+        values = dict(interviewed)
+        for dimension in DIMENSIONS:
+            values[f'{dimension}_fk'] = self._dimension_ids[
+                dimension, values.pop(dimension)
+            ]
+
+        return values
+
+    async def _load_partitions(self):
+        async with async_engine.connect() as conn:
+            self._partitions = await PartitionService(conn).existing()
+
+    async def _ensure_partitions(self, days):
+        # Every month gets its partition before its answers are written.
+        # They are committed on their own and only then marked as known,
+        # otherwise other writers would route those answers to the default
+        # partition.
+        months = {MONTHLY_PARTITION.format(day): day for day in days}
+        if months.keys() <= self._partitions:
+            return
+
+        async with self._partition_lock:
+            missing = sorted(
+                day
+                for name, day in months.items()
+                if name not in self._partitions
+            )
+            if not missing:
+                return
+
+            async with async_engine.begin() as conn:
+                service = PartitionService(conn)
+                created = [await service.create(day) for day in missing]
+
+            self._partitions.update(created)
+
+    async def _copy_answers(self, conn, rows, interviewed_ids, question_ids):
+        raw_connection = await conn.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        async with driver_connection.cursor() as cursor:
+            async with cursor.copy(COPY_RESPOSTAS) as copy:
+                for interviewed_id, parsed_row in zip(interviewed_ids, rows):
+                    for question_key, nota, comentario in parsed_row.answers:
+                        await copy.write_row((
+                            parsed_row.response_date,
+                            nota,
+                            comentario,
+                            question_ids[question_key],
+                            interviewed_id,
+                        ))
+
+    async def _bulk_insert_batch(self, conn, rows, question_ids):
+        await self._resolve_dimensions(rows)
+        with reject_imported_rows():
+            result = await conn.execute(
+                insert(Entrevistado).returning(
+                    Entrevistado.id, sort_by_parameter_order=True
+                ),
+                [self._dimension_keys(row.interviewed) for row in rows],
+            )
+        interviewed_ids = result.scalars().all()
+        await self._copy_answers(conn, rows, interviewed_ids, question_ids)
+        self._dates.update(row.response_date for row in rows)
+        self._stats['inserted'] += len(interviewed_ids)
+
+    async def _upsert_answers(self, conn, rows, interviewed_ids, question_ids):
+        statement = pg_insert(Resposta)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            constraint='uq_respostas_entrevistado_fk_pergunta_fk_data',
+            set_={
+                'nota': excluded.nota,
+                'comentario': excluded.comentario,
+                'updated_at': func.now(),
+            },
+            where=or_(
+                Resposta.nota.is_distinct_from(excluded.nota),
+                Resposta.comentario.is_distinct_from(excluded.comentario),
             ),
-            ('eNPS', '[Aberta] eNPS'),
-        ]
+        )
+        await conn.execute(
+            statement,
+            [
+                {
+                    'data': parsed_row.response_date,
+                    'nota': nota,
+                    'comentario': comentario,
+                    'pergunta_fk': question_ids[question_key],
+                    'entrevistado_fk': interviewed_id,
+                }
+                for interviewed_id, parsed_row in zip(interviewed_ids, rows)
+                for question_key, nota, comentario in parsed_row.answers
+            ],
+        )
 
-        responses = []
-        for question_key, comment_key in answer_keys:
-            response_date = datetime.strptime(
-                answer_data['Data da Resposta'], '%d/%m/%Y'
-            ).date()
-            question = self._get_pergunta(question_key)
-            response_value = int(answer_data[question_key])
-            response_comment = answer_data[comment_key]
-            response = Resposta(
-                data=response_date,
-                nota=response_value,
-                comentario=response_comment,
-                pergunta=question,
-                entrevistado=interviewed
+    async def _upsert_batch(self, conn, rows, question_ids):
+        # The last occurrence wins when a batch repeats a respondent, as
+        # ON CONFLICT can't update the same row twice in one statement.
+        rows_by_key = {
+            (row.interviewed['email_corporativo'], row.response_date): row
+            for row in rows
+        }
+        # Upserting in key order, like the dimension values, keeps writers
+        # with overlapping respondents from locking them in opposite orders.
+        sorted_rows = [rows_by_key[key] for key in sorted(rows_by_key)]
+        await self._resolve_dimensions(sorted_rows)
+        statement = pg_insert(Entrevistado)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            constraint=RESPONDENT_KEY,
+            set_={
+                **{
+                    column: getattr(excluded, column)
+                    for column in UPSERT_COLUMNS
+                },
+                'updated_at': func.now(),
+            },
+            where=Entrevistado.row_hash.is_distinct_from(excluded.row_hash),
+        ).returning(
+            Entrevistado.id,
+            Entrevistado.email_corporativo,
+            Entrevistado.data_resposta,
+            literal_column('xmax = 0').label('inserted'),
+        )
+        result = await conn.execute(
+            statement,
+            [self._dimension_keys(row.interviewed) for row in sorted_rows],
+        )
+        changed = result.all()
+
+        if changed:
+            await self._upsert_answers(
+                conn,
+                [
+                    rows_by_key[row.email_corporativo, row.data_resposta]
+                    for row in changed
+                ],
+                [row.id for row in changed],
+                question_ids,
             )
-            responses.append(response)
+            self._dates.update(row.data_resposta for row in changed)
 
-        return responses
+        inserted = sum(row.inserted for row in changed)
+        self._stats['inserted'] += inserted
+        self._stats['updated'] += len(changed) - inserted
+        self._stats['unchanged'] += len(rows) - len(changed)
 
-    async def process(self):
-        print('Reading CSV data')
-        self._read_csv_data()
-        total = len(self._data)
-        print(f'Read {total} answers')
-        print('Importing CSV Data to the database')
+    async def _parse_batches(self, queue, batch_size, workers, writers):
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        max_pending = workers * 2
+        pending = set()
+
+        async def drain(return_when):
+            nonlocal pending
+            done, pending = await asyncio.wait(
+                pending, return_when=return_when
+            )
+            for future in done:
+                await queue.put(future.result())
+
+        for csv_path in self._csv_paths:
+            for chunk in csv_chunks(csv_path, batch_size):
+                if pool is None:
+                    await queue.put(parse_chunk(csv_path, *chunk))
+                    continue
+
+                if len(pending) >= max_pending:
+                    await drain(asyncio.FIRST_COMPLETED)
+                pending.add(
+                    loop.run_in_executor(pool, parse_chunk, csv_path, *chunk)
+                )
+
+        if pending:
+            await drain(asyncio.ALL_COMPLETED)
+
+        for _ in range(writers):
+            await queue.put(None)
+
+    async def _write_batches(self, queue, question_ids, single_transaction):
+        write_batch = (
+            self._upsert_batch
+            if self._incremental
+            else self._bulk_insert_batch
+        )
+        async with async_engine.connect() as conn:
+            while (item := await queue.get()) is not None:
+                parsed_rows, errors = item
+                self._errors.extend(errors)
+                if parsed_rows:
+                    await self._ensure_partitions(
+                        row.response_date for row in parsed_rows
+                    )
+                    await write_batch(conn, parsed_rows, question_ids)
+                    if not single_transaction:
+                        await conn.commit()
+
+                self._count += len(parsed_rows)
+                print(f'Imported {self._count} answers', end='\r', flush=True)
+
+            await conn.commit()
+
+    async def process_bulk(
+        self,
+        batch_size=DEFAULT_BATCH_SIZE,
+        single_transaction=False,
+        workers=0,
+        writers=1,
+        incremental=False,
+    ):
+        mode = 'incremental' if incremental else 'bulk'
+        print(
+            f'Importing {len(self._csv_paths)} CSV file(s) to the database '
+            f'in {mode} mode ({workers} parser(s), {writers} writer(s))'
+        )
         print()
-        for count, answer_data in enumerate(self._data, start=1):
-            interviewed = self._extract_interviewed(answer_data)
-            answers = self._extract_answers(answer_data, interviewed)
+        start = time.perf_counter()
+        self._incremental = incremental
 
+        async with async_engine.connect() as conn:
+            question_ids = await self._ensure_questions(conn)
+            await conn.commit()
+        await self._load_partitions()
+
+        queue = asyncio.Queue(maxsize=writers * 2)
+        self._pool = ProcessPoolExecutor(workers) if workers else None
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(
+                    self._parse_batches(queue, batch_size, workers, writers)
+                )
+                for _ in range(writers):
+                    group.create_task(
+                        self._write_batches(
+                            queue, question_ids, single_transaction
+                        )
+                    )
+        except* AlreadyImportedError as group:
+            raise group.exceptions[0] from None
+        finally:
+            if self._pool:
+                self._pool.shutdown(cancel_futures=True)
+
+        await self._publish_import()
+        self._report(self._count, time.perf_counter() - start)
+
+    async def process(self, batch_size=DEFAULT_BATCH_SIZE):
+        print('Importing CSV Data to the database')
+        print()
+        start = time.perf_counter()
+        count = 0
+        await self._load_perguntas()
+        await self._load_dimensoes()
+        await self._load_partitions()
+        for models in self._iter_models(batch_size):
+            dates = {
+                model.data_resposta
+                for model in models
+                if isinstance(model, Entrevistado)
+            }
+            await self._ensure_partitions(dates)
+            # The session inserts each table of the batch with multi-row
+            # statements
             async with AsyncSession(
                 async_engine, expire_on_commit=False
             ) as session:
-                session.add(interviewed)
-                session.add_all(answers)
-                await session.commit()
+                session.add_all(models)
+                with reject_imported_rows():
+                    await session.commit()
+
+            self._dates.update(dates)
+            count += sum(isinstance(model, Entrevistado) for model in models)
+            print(f'Imported {count} answers', end='\r', flush=True)
+
+        await self._publish_import()
+        self._report(count, time.perf_counter() - start)
+
+    async def _publish_import(self):
+        # The rollups and the dataset version change in one transaction, so
+        # the API caches are only dropped once the new counts are in place.
+        if not self._dates:
+            return
 
-            print(f'Imported {count:03d} of {total}', end='\r', flush=True)
+        async with async_engine.begin() as conn:
+            await RollupService(conn).refresh(sorted(self._dates))
+            await DatasetVersionService(conn).bump()
 
+    def _report(self, total, elapsed):
+        rate = total / elapsed if elapsed else 0
         print()
         print()
+        if self._errors:
+            print(f'Skipped {len(self._errors)} invalid rows:')
+            for error in self._errors[:MAX_REPORTED_ERRORS]:
+                print(f'  {error}')
+            print()
+        if self._incremental:
+            print(
+                f'Inserted {self._stats["inserted"]}, '
+                f'updated {self._stats["updated"]}, '
+                f'unchanged {self._stats["unchanged"]}'
+            )
+        print(
+            f'Imported {total} answers in {elapsed:.2f}s ({rate:.1f} rows/s)'
+        )
         print('Importing Finished!!')
 
 
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Import survey answers from CSV files into the database.'
+    )
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        default=['data.csv'],
+        help='CSV files or directories containing CSV files.',
+    )
+    parser.add_argument(
+        '--bulk',
+        action='store_true',
+        help='Load rows in batches using multi-row INSERT and COPY.',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=(
+            'Upsert rows by corporate email and response date, skipping '
+            'the unchanged ones. Implies --bulk.'
+        ),
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help='Number of CSV rows per batch.',
+    )
+    parser.add_argument(
+        '--single-transaction',
+        action='store_true',
+        help='Commit the bulk import once instead of after every batch.',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=os.process_cpu_count(),
+        help='Processes parsing CSV rows in bulk mode (0 parses inline).',
+    )
+    parser.add_argument(
+        '--writers',
+        type=int,
+        default=DEFAULT_WRITERS,
+        help='Concurrent database writers in bulk mode.',
+    )
+
+    parsed = parser.parse_args(args)
+    parsed.bulk = parsed.bulk or parsed.incremental
+    if parsed.bulk and parsed.single_transaction and parsed.writers != 1:
+        parser.error('--single-transaction requires --writers 1')
+
+    return parsed
+
+
 async def main():
-    populator = DataCSVPopulator()
-    await populator.process()
+    args = parse_args()
+    populator = DataCSVPopulator(args.paths)
+    try:
+        if args.bulk:
+            await populator.process_bulk(
+                args.batch_size,
+                args.single_transaction,
+                args.workers,
+                args.writers,
+                args.incremental,
+            )
+        else:
+            await populator.process(args.batch_size)
+    except AlreadyImportedError as exc:
+        raise SystemExit(f'Import failed: {exc}') from exc
 
 
 if __name__ == '__main__':
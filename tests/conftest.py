@@ -4,12 +4,17 @@ import pytest
 from factory import Factory, Sequence, SubFactory
 from factory.fuzzy import FuzzyDate, FuzzyInteger, FuzzyText
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
+from playground_api import database
+from playground_api.analytics import analytics_engine
 from playground_api.app import app
-from playground_api.database import get_session
+from playground_api.cache import result_cache
 from playground_api.models import (
+    DIMENSIONS,
+    Dimensao,
     Entrevistado,
     Pergunta,
     Resposta,
@@ -47,17 +52,41 @@ async def session(engine):
         await conn.run_sync(table_registry.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+async def clear_cache():
+    await result_cache.clear()
+    analytics_engine.clear()
+
+
 @pytest.fixture
-def client(session):
-    def get_session_override():
-        return session
+def statements(engine):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    yield executed
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
+@pytest.fixture
+def client(session, engine, monkeypatch):
+    # Requests check out their connections from the test database
+    monkeypatch.setattr(
+        database, 'replica_router', database.ReplicaRouter(engine, [], 0)
+    )
 
     with TestClient(app) as client:
-        app.dependency_overrides[get_session] = get_session_override
+        # The tests add their data after startup, so the snapshot warmed up
+        # by the lifespan is dropped.
+        analytics_engine.clear()
         yield client
 
-    app.dependency_overrides.clear()
-
 
 class PerguntaFactory(Factory):
     class Meta:
@@ -66,6 +95,14 @@ class PerguntaFactory(Factory):
     pergunta = Sequence(lambda n: QUESTIONS[n % len(QUESTIONS)])
 
 
+class DimensaoFactory(Factory):
+    class Meta:
+        model = Dimensao
+
+    tipo = 'localidade'
+    valor = FuzzyText()
+
+
 class EntrevistadoFactory(Factory):
     class Meta:
         model = Entrevistado
@@ -73,18 +110,21 @@ class EntrevistadoFactory(Factory):
     nome = FuzzyText()
     email = FuzzyText()
     email_corporativo = FuzzyText()
-    genero = FuzzyText()
-    geracao = FuzzyText()
-    area = FuzzyText()
-    cargo = FuzzyText()
-    funcao = FuzzyText()
-    localidade = FuzzyText()
-    tempo_empresa = FuzzyText()
-    n0_empresa = FuzzyText()
-    n1_diretoria = FuzzyText()
-    n2_gerencia = FuzzyText()
-    n3_coordenacao = FuzzyText()
-    n4_area = FuzzyText()
+    data_resposta = FuzzyDate(date.today())
+    genero_dimensao = SubFactory(DimensaoFactory, tipo='genero')
+    geracao_dimensao = SubFactory(DimensaoFactory, tipo='geracao')
+    area_dimensao = SubFactory(DimensaoFactory, tipo='area')
+    cargo_dimensao = SubFactory(DimensaoFactory, tipo='cargo')
+    funcao_dimensao = SubFactory(DimensaoFactory, tipo='funcao')
+    localidade_dimensao = SubFactory(DimensaoFactory, tipo='localidade')
+    tempo_empresa_dimensao = SubFactory(DimensaoFactory, tipo='tempo_empresa')
+    n0_empresa_dimensao = SubFactory(DimensaoFactory, tipo='n0_empresa')
+    n1_diretoria_dimensao = SubFactory(DimensaoFactory, tipo='n1_diretoria')
+    n2_gerencia_dimensao = SubFactory(DimensaoFactory, tipo='n2_gerencia')
+    n3_coordenacao_dimensao = SubFactory(
+        DimensaoFactory, tipo='n3_coordenacao'
+    )
+    n4_area_dimensao = SubFactory(DimensaoFactory, tipo='n4_area')
 
 
 class RespostaFactory(Factory):
@@ -105,6 +145,11 @@ async def entrevistado(session):
     session.add(obj)
     await session.commit()
     await session.refresh(obj)
+    # Refreshing unloads the lazy relationships, the dimensions are read
+    # back so the tests can use their values without awaiting.
+    await session.refresh(
+        obj, [f'{dimension}_dimensao' for dimension in DIMENSIONS]
+    )
 
     return obj
 
@@ -117,3 +162,14 @@ async def resposta(session):
     await session.refresh(obj)
 
     return obj
+
+
+@pytest.fixture
+async def entrevistados(session):
+    objs = EntrevistadoFactory.build_batch(3)
+    for obj in objs:
+        RespostaFactory.build_batch(8, entrevistado=obj)
+    session.add_all(objs)
+    await session.commit()
+
+    return objs
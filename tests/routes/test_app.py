@@ -1,5 +1,10 @@
 from http import HTTPStatus
 
+from fastapi.testclient import TestClient
+
+from playground_api import database
+from playground_api.analytics import analytics_engine
+from playground_api.app import app
 from playground_api.settings import Settings
 
 
@@ -16,3 +21,14 @@ def test_get_version_should_return_version(client):
     assert response.status_code == HTTPStatus.OK
     response_json = response.json()
     assert response_json == {'version': Settings().VERSION}
+
+
+def test_startup_should_warm_up_analytics_snapshot(
+    session, engine, monkeypatch
+):
+    monkeypatch.setattr(
+        database, 'replica_router', database.ReplicaRouter(engine, [], 0)
+    )
+
+    with TestClient(app):
+        assert analytics_engine.version == 0
@@ -1,5 +1,9 @@
+from datetime import date
 from http import HTTPStatus
 
+from playground_api.services import SCORES
+from tests.conftest import QUESTIONS
+
 
 def test_get_nps_should_calculate_nps(client, entrevistado):
     response = client.get('/calculations/nps')
@@ -9,6 +13,25 @@ def test_get_nps_should_calculate_nps(client, entrevistado):
     assert isinstance(response_data['nps'], float)
 
 
+def test_get_nps_should_filter_by_date_range(client, entrevistado):
+    response = client.get(
+        '/calculations/nps',
+        params={'start': '2000-01-01', 'end': '2000-12-31'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'nps': 0}
+
+
+def test_get_nps_with_inverted_date_range_should_fail(client):
+    response = client.get(
+        '/calculations/nps',
+        params={'start': '2000-12-31', 'end': '2000-01-01'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
 def test_get_medians_should_calculate_questions_medians(client, entrevistado):
     question_size = 7
     response = client.get('/calculations/medians')
@@ -22,10 +45,114 @@ def test_get_medians_should_calculate_questions_medians(client, entrevistado):
 def test_get_count_by_area_should_return_answers_from_location(
     client, entrevistado
 ):
-    response = client.get(
-        f'/calculations/answers_location/{entrevistado.localidade}'
-    )
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(f'/calculations/answers_location/{location}')
 
     assert response.status_code == HTTPStatus.OK
     response_data = response.json()
     assert response_data['count'] == 1
+
+
+def test_get_percentiles_should_return_quantiles_per_question(
+    client, entrevistado
+):
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(
+        '/calculations/percentiles',
+        params={'q': [0.1, 0.9], 'group_by': 'localidade'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    percentiles = response.json()['percentiles']
+    assert len(percentiles) == len(QUESTIONS)
+    assert percentiles[0]['group'] == location
+    assert set(percentiles[0]['percentiles']) == {'p10', 'p90'}
+
+
+def test_get_percentiles_with_invalid_quantile_should_fail(client):
+    response = client.get('/calculations/percentiles', params={'q': 1.5})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_breakdown_should_group_answers_by_dimension(client, entrevistado):
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(
+        '/calculations/breakdown',
+        params={'group_by': ['localidade', 'genero'], 'localidade': location},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    breakdown = response.json()['breakdown']
+    assert len(breakdown) == len(QUESTIONS)
+    assert breakdown[0]['group']['localidade'] == location
+    assert set(breakdown[0]['group']) == {'localidade', 'genero'}
+    assert sum(breakdown[0]['distribution']) == breakdown[0]['count']
+
+
+def test_get_breakdown_with_too_many_groups_should_fail(client):
+    response = client.get(
+        '/calculations/breakdown',
+        params={'group_by': ['area', 'cargo', 'genero', 'localidade']},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_histograms_should_count_answers_per_score(client, entrevistado):
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(
+        '/calculations/histograms', params={'localidade': location}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    histograms = response.json()['histograms']
+    assert len(histograms) == len(QUESTIONS)
+    assert all(len(row['distribution']) == SCORES for row in histograms)
+    assert all(row['count'] == 1 for row in histograms)
+
+
+def test_get_trend_should_return_nps_and_means_per_period(
+    client, entrevistado
+):
+    response = client.get('/calculations/trend', params={'bucket': 'day'})
+
+    assert response.status_code == HTTPStatus.OK
+    (point,) = response.json()['trend']
+    assert point['period'] == date.today().isoformat()
+    assert isinstance(point['nps'], float)
+    assert len(point['means']) == len(QUESTIONS) - 1
+
+
+def test_get_hierarchy_should_return_nested_tree(client, entrevistado):
+    n0_empresa = entrevistado.n0_empresa_dimensao.valor
+
+    response = client.get('/calculations/hierarchy')
+
+    assert response.status_code == HTTPStatus.OK
+    tree = response.json()
+    assert tree['respondents'] == 1
+    (empresa,) = tree['children']
+    assert (empresa['level'], empresa['name']) == ('n0_empresa', n0_empresa)
+    assert len(empresa['means']) == len(QUESTIONS) - 1
+
+
+def test_get_count_by_locations_should_return_requested_locations(
+    client, entrevistado
+):
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(
+        '/calculations/answers_location',
+        params={'localidade': [location, 'invalid']},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['locations'] == [
+        {'localidade': location, 'count': 1},
+        {'localidade': 'invalid', 'count': 0},
+    ]
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.mark.parametrize(
+    'url',
+    [
+        '/calculations/nps',
+        '/calculations/medians',
+        '/responses/interviewed',
+        '/responses/flat_export',
+    ],
+)
+def test_get_should_send_etag_and_cache_control(client, entrevistado, url):
+    response = client.get(url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag']
+    assert response.headers['cache-control'].startswith('public, max-age=')
+
+
+def test_get_with_matching_etag_should_return_not_modified(
+    client, entrevistado
+):
+    etag = client.get('/calculations/nps').headers['etag']
+
+    response = client.get(
+        '/calculations/nps', headers={'If-None-Match': f'"other", W/{etag}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+
+
+def test_get_with_stale_etag_should_return_body(client, entrevistado):
+    response = client.get(
+        '/calculations/nps', headers={'If-None-Match': '"stale"'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'nps' in response.json()
+
+
+@pytest.fixture
+def checkouts(engine):
+    connections = []
+
+    def on_checkout(dbapi_connection, record, proxy):
+        connections.append(dbapi_connection)
+
+    event.listen(engine.sync_engine, 'checkout', on_checkout)
+    yield connections
+    event.remove(engine.sync_engine, 'checkout', on_checkout)
+
+
+def test_not_modified_should_not_check_out_connection(
+    client, entrevistado, checkouts
+):
+    etag = client.get('/responses/interviewed').headers['etag']
+    checkouts.clear()
+
+    response = client.get(
+        '/responses/interviewed', headers={'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert checkouts == []
+
+
+def test_response_page_should_use_a_single_connection(
+    client, entrevistado, checkouts
+):
+    client.get('/calculations/nps')
+    checkouts.clear()
+
+    response = client.get('/responses/interviewed')
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(checkouts) == 1
+
+
+def test_cached_calculation_should_not_check_out_connection(
+    client, entrevistado, checkouts
+):
+    client.get('/calculations/nps')
+    checkouts.clear()
+
+    response = client.get('/calculations/nps')
+
+    assert response.status_code == HTTPStatus.OK
+    assert checkouts == []
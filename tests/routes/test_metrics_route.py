@@ -0,0 +1,26 @@
+from http import HTTPStatus
+
+from playground_api.settings import Settings
+
+
+def test_get_cache_metrics_should_count_cache_hits(client, entrevistado):
+    client.get('/calculations/nps')
+    client.get('/calculations/nps')
+
+    response = client.get('/metrics/cache')
+
+    assert response.status_code == HTTPStatus.OK
+    response_data = response.json()
+    assert response_data['hits'] == 1
+    assert response_data['misses'] == 1
+    assert response_data['size'] == 1
+
+
+def test_get_pool_metrics_should_return_pool_usage(client):
+    response = client.get('/metrics/pool')
+
+    assert response.status_code == HTTPStatus.OK
+    response_data = response.json()
+    assert response_data['size'] == Settings().DB_POOL_SIZE
+    assert response_data['checked_out'] == 0
+    assert response_data['replicas'] == []
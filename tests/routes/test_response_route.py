@@ -1,5 +1,13 @@
+import csv
+import io
+import json
 from http import HTTPStatus
 
+import pytest
+
+from playground_api.pagination import encode_cursor
+from playground_api.routes import responses_route
+
 DEFAULT_PAGE = 0
 DEFAULT_LIMIT = 25
 
@@ -40,7 +48,9 @@ async def test_get_pergunta_respostas_should_return_responses(
 
 
 def test_get_response_location_should_return_responses(client, entrevistado):
-    response = client.get(f'/responses/company/{entrevistado.localidade}')
+    location = entrevistado.localidade_dimensao.valor
+
+    response = client.get(f'/responses/company/{location}')
 
     assert response.status_code == HTTPStatus.OK
     response_json = response.json()
@@ -62,3 +72,136 @@ def test_get_flat_list_should_return_entrevistados_flat_list(
     assert response_json['limit'] == DEFAULT_LIMIT
     assert response_json['entrevistados'][0]['nome'] == entrevistado.nome
     assert 'enps' in response_json['entrevistados'][0].keys()
+
+
+def test_get_entrevistados_should_walk_pages_with_cursor(
+    client, entrevistados
+):
+    response = client.get('/responses/interviewed', params={'limit': 2})
+    first_page = response.json()
+    response = client.get(
+        '/responses/interviewed',
+        params={'limit': 2, 'cursor': first_page['next_cursor']},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    second_page = response.json()
+    assert second_page['next_cursor'] is None
+    assert [e['id'] for e in first_page['entrevistados']] + [
+        e['id'] for e in second_page['entrevistados']
+    ] == [e.id for e in entrevistados]
+
+
+def test_get_entrevistados_with_invalid_cursor_should_fail(client):
+    response = client.get('/responses/interviewed', params={'cursor': 'x'})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_flat_list_should_return_next_cursor_on_full_page(
+    client, entrevistados
+):
+    response = client.get('/responses/flat_list', params={'limit': 1})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['next_cursor'] is not None
+
+
+def test_get_response_location_should_paginate_with_cursor(
+    client, entrevistado
+):
+    location = entrevistado.localidade_dimensao.valor
+    response = client.get(
+        f'/responses/company/{location}', params={'limit': 1}
+    )
+    cursor = response.json()['next_cursor']
+
+    response = client.get(
+        f'/responses/company/{location}',
+        params={'limit': 1, 'cursor': cursor},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['entrevistados'] == []
+
+
+def test_get_pergunta_respostas_should_paginate_with_cursor(client, resposta):
+    response = client.get(
+        f'/responses/question/{resposta.pergunta_fk}', params={'limit': 1}
+    )
+    cursor = response.json()['next_cursor']
+
+    response = client.get(
+        f'/responses/question/{resposta.pergunta_fk}',
+        params={'limit': 1, 'cursor': cursor},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['respostas'] == []
+
+
+@pytest.fixture
+def small_export_chunks(monkeypatch):
+    monkeypatch.setattr(responses_route, 'EXPORT_CHUNK_SIZE', 2)
+
+
+def test_export_flat_should_stream_ndjson(
+    client, entrevistados, small_export_chunks
+):
+    response = client.get('/responses/flat_export')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['id'] for line in lines] == [e.id for e in entrevistados]
+
+
+def test_export_flat_should_stream_csv(
+    client, entrevistados, small_export_chunks
+):
+    response = client.get('/responses/flat_export', params={'format': 'csv'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row['id']) for row in rows] == [e.id for e in entrevistados]
+    assert rows[0]['nome'] == entrevistados[0].nome
+
+
+def test_export_flat_without_data_should_return_only_header(client):
+    response = client.get('/responses/flat_export', params={'format': 'csv'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.text.splitlines()[0].startswith('id,nome,')
+    assert len(response.text.splitlines()) == 1
+
+
+def test_list_interviewed_should_reuse_cached_page(
+    client, entrevistados, statements
+):
+    response = client.get('/responses/interviewed?limit=2')
+    statements.clear()
+
+    cached_response = client.get('/responses/interviewed?limit=2')
+
+    assert cached_response.json() == response.json()
+    assert statements == []
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'page': responses_route.settings.CACHE_MAX_PAGES},
+        {'cursor': encode_cursor(1)},
+    ],
+    ids=['deep-page', 'cursor'],
+)
+def test_list_interviewed_should_not_cache_deep_pages(
+    client, entrevistados, statements, params
+):
+    client.get('/responses/interviewed', params=params)
+    statements.clear()
+
+    client.get('/responses/interviewed', params=params)
+
+    assert statements
@@ -1,6 +1,20 @@
+from datetime import date
+
 import pytest
 
-from playground_api.services import CalculationService
+from playground_api.cache import MemoryCacheBackend, ResultCache
+from playground_api.schemas import Dimension, PercentileMethod, TrendBucket
+from playground_api.services import (
+    CalculationService,
+    DatasetVersionService,
+    RollupService,
+)
+from tests.conftest import (
+    DimensaoFactory,
+    EntrevistadoFactory,
+    PerguntaFactory,
+    RespostaFactory,
+)
 
 
 @pytest.fixture
@@ -8,6 +22,16 @@ def service(session):
     return CalculationService(session)
 
 
+@pytest.fixture
+def rollup_service(session):
+    return CalculationService(session, use_rollups=True)
+
+
+async def refresh_rollups(session):
+    await RollupService(session).refresh()
+    await session.commit()
+
+
 async def test_calculate_nps_should_return_nps_data(service, entrevistado):
     nps_data = await service.calculate_nps()
 
@@ -45,7 +69,7 @@ async def test_count_locations_should_return_count_by_location(
     service, entrevistado
 ):
     location_count_data = await service.interviewed_by_location(
-        entrevistado.localidade
+        entrevistado.localidade_dimensao.valor
     )
 
     assert location_count_data == 1
@@ -57,3 +81,403 @@ async def test_count_invalid_location_should_return_count_by_location(
     location_count_data = await service.interviewed_by_location('invalid')
 
     assert location_count_data == 0
+
+
+async def test_calculate_nps_should_only_count_enps_answers(service, session):
+    # 2 promoters, 1 passive and 1 detractor: (2 - 1) / 4 = 25%
+    expected_nps = 25.0
+    enps = PerguntaFactory(pergunta='eNPS')
+    feedback = PerguntaFactory(pergunta='Feedback')
+    for nota in (10, 9, 7, 3):
+        entrevistado = EntrevistadoFactory()
+        RespostaFactory(entrevistado=entrevistado, pergunta=enps, nota=nota)
+        RespostaFactory(entrevistado=entrevistado, pergunta=feedback, nota=1)
+        session.add(entrevistado)
+    await session.commit()
+
+    nps_data = await service.calculate_nps()
+
+    assert nps_data == expected_nps
+
+
+@pytest.fixture
+async def feedback_answers(session):
+    feedback = PerguntaFactory(pergunta='Feedback')
+    areas = {
+        area: DimensaoFactory(tipo='area', valor=area) for area in ('a', 'b')
+    }
+    for area, nota in (('a', 1), ('a', 2), ('b', 3), ('b', 10)):
+        RespostaFactory(
+            entrevistado=EntrevistadoFactory(area_dimensao=areas[area]),
+            pergunta=feedback,
+            nota=nota,
+        )
+    session.add(feedback)
+    await session.commit()
+
+
+async def test_calculate_medians_should_interpolate_median(
+    service, feedback_answers
+):
+    expected_median = 2.5
+
+    means_data = await service.calculate_medians()
+
+    assert means_data == {'Feedback': expected_median}
+
+
+async def test_calculate_percentiles_should_return_requested_quantiles(
+    service, feedback_answers
+):
+    percentiles = await service.calculate_percentiles([0.25, 0.5])
+
+    assert percentiles == [
+        {
+            'pergunta': 'Feedback',
+            'group': None,
+            'percentiles': {'p25': 1.75, 'p50': 2.5},
+        }
+    ]
+
+
+async def test_calculate_discrete_percentiles_should_group_by_dimension(
+    service, feedback_answers
+):
+    percentiles = await service.calculate_percentiles(
+        [0.5], Dimension.AREA, PercentileMethod.DISCRETE
+    )
+
+    assert percentiles == [
+        {'pergunta': 'Feedback', 'group': 'a', 'percentiles': {'p50': 1}},
+        {'pergunta': 'Feedback', 'group': 'b', 'percentiles': {'p50': 3}},
+    ]
+
+
+async def test_rollup_calculations_should_match_raw_tables(
+    service, rollup_service, session, entrevistados
+):
+    await refresh_rollups(session)
+    location = entrevistados[0].localidade_dimensao.valor
+
+    assert await rollup_service.calculate_nps() == (
+        await service.calculate_nps()
+    )
+    assert await rollup_service.calculate_medians() == (
+        await service.calculate_medians()
+    )
+    assert await rollup_service.interviewed_by_location(location) == (
+        await service.interviewed_by_location(location)
+    )
+
+
+async def test_rollup_medians_should_interpolate_median(
+    rollup_service, session, feedback_answers
+):
+    expected_median = 2.5
+    await refresh_rollups(session)
+
+    means_data = await rollup_service.calculate_medians()
+
+    assert means_data == {'Feedback': expected_median}
+
+
+async def test_rollup_calculations_without_data_should_return_zero(
+    rollup_service,
+):
+    assert await rollup_service.calculate_nps() == 0
+    assert await rollup_service.calculate_medians() == {}
+    assert await rollup_service.interviewed_by_location('invalid') == 0
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_calculate_histograms_should_count_answers_per_score(
+    session, feedback_answers, use_rollups
+):
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+
+    histograms = await service.calculate_histograms({'area': 'b'})
+
+    assert histograms == [
+        {
+            'pergunta': 'Feedback',
+            'count': 2,
+            'distribution': [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1],
+        }
+    ]
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_calculate_histograms_should_skip_scores_out_of_range(
+    session, use_rollups
+):
+    feedback = PerguntaFactory(pergunta='Feedback')
+    for nota in (-1, 1, 11):
+        RespostaFactory(pergunta=feedback, nota=nota)
+    session.add(feedback)
+    await session.commit()
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+
+    histograms = await service.calculate_histograms()
+
+    assert histograms == [
+        {
+            'pergunta': 'Feedback',
+            'count': 1,
+            'distribution': [0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+        }
+    ]
+
+
+async def test_rollup_histograms_should_match_raw_tables(
+    service, rollup_service, session, entrevistados
+):
+    await refresh_rollups(session)
+    cargo = entrevistados[0].cargo_dimensao.valor
+
+    assert await rollup_service.calculate_histograms() == (
+        await service.calculate_histograms()
+    )
+    assert await rollup_service.calculate_histograms({'cargo': cargo}) == (
+        await service.calculate_histograms({'cargo': cargo})
+    )
+
+
+async def test_calculate_histograms_without_matches_should_return_empty(
+    service, feedback_answers
+):
+    assert await service.calculate_histograms({'area': 'invalid'}) == []
+
+
+@pytest.fixture
+async def monthly_answers(session):
+    enps = PerguntaFactory(pergunta='eNPS')
+    feedback = PerguntaFactory(pergunta='Feedback')
+    for data, nota in ((date(2022, 1, 10), 10), (date(2022, 2, 10), 0)):
+        entrevistado = EntrevistadoFactory()
+        for pergunta in (enps, feedback):
+            RespostaFactory(
+                entrevistado=entrevistado,
+                pergunta=pergunta,
+                nota=nota,
+                data=data,
+            )
+        session.add(entrevistado)
+    await session.commit()
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_date_bounded_calculations_should_only_use_answers_in_range(
+    session, monthly_answers, use_rollups
+):
+    expected_nps = 100.0
+    expected_score = 10
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+    start, end = date(2022, 1, 1), date(2022, 1, 31)
+
+    assert await service.calculate_nps(start, end) == expected_nps
+    assert await service.calculate_medians(start, end) == {
+        'Feedback': expected_score
+    }
+    percentiles = await service.calculate_percentiles([0.5], end=end)
+    assert [row['percentiles'] for row in percentiles] == [
+        {'p50': expected_score},
+        {'p50': expected_score},
+    ]
+    histograms = await service.calculate_histograms(start=start, end=end)
+    assert [row['distribution'][expected_score] for row in histograms] == [
+        1,
+        1,
+    ]
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_calculate_trend_should_bucket_answers_by_period(
+    session, monthly_answers, use_rollups
+):
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+
+    trend = await service.calculate_trend(TrendBucket.MONTH)
+
+    assert trend == [
+        {'period': '2022-01-01', 'nps': 100.0, 'means': {'Feedback': 10.0}},
+        {'period': '2022-02-01', 'nps': -100.0, 'means': {'Feedback': 0.0}},
+    ]
+
+
+async def test_calculate_trend_should_apply_filters_and_dates(
+    service, monthly_answers
+):
+    trend = await service.calculate_trend(
+        TrendBucket.QUARTER, {'area': 'invalid'}
+    )
+    bounded_trend = await service.calculate_trend(
+        TrendBucket.WEEK, start=date(2022, 2, 1)
+    )
+
+    assert trend == []
+    assert [point['period'] for point in bounded_trend] == ['2022-02-07']
+
+
+@pytest.fixture
+async def hierarchy_answers(session):
+    enps = PerguntaFactory(pergunta='eNPS')
+    feedback = PerguntaFactory(pergunta='Feedback')
+    empresa = DimensaoFactory(tipo='n0_empresa', valor='empresa')
+    diretorias = {
+        diretoria: DimensaoFactory(tipo='n1_diretoria', valor=diretoria)
+        for diretoria in ('a', 'b')
+    }
+    for diretoria, nota in (('a', 10), ('a', 0), ('b', 9)):
+        entrevistado = EntrevistadoFactory(
+            n0_empresa_dimensao=empresa,
+            n1_diretoria_dimensao=diretorias[diretoria],
+        )
+        for pergunta in (enps, feedback):
+            RespostaFactory(
+                entrevistado=entrevistado, pergunta=pergunta, nota=nota
+            )
+        session.add(entrevistado)
+    await session.commit()
+
+
+async def test_calculate_hierarchy_should_aggregate_every_level(
+    service, hierarchy_answers
+):
+    expected_nps = 33.33
+    expected_mean = 6.33
+
+    tree = await service.calculate_hierarchy()
+
+    assert tree['level'] is None
+    assert (tree['respondents'], tree['nps']) == (3, expected_nps)
+    assert tree['means'] == {'Feedback': expected_mean}
+    (empresa,) = tree['children']
+    assert (empresa['level'], empresa['name']) == ('n0_empresa', 'empresa')
+    assert empresa['respondents'] == tree['respondents']
+    diretorias = empresa['children']
+    assert [
+        (node['name'], node['respondents'], node['nps'], node['means'])
+        for node in diretorias
+    ] == [
+        ('a', 2, 0.0, {'Feedback': 5.0}),
+        ('b', 1, 100.0, {'Feedback': 9.0}),
+    ]
+    leaf = diretorias[0]['children'][0]['children'][0]['children'][0]
+    assert (leaf['level'], leaf['children']) == ('n4_area', [])
+
+
+async def test_calculate_hierarchy_should_apply_filters(
+    service, hierarchy_answers
+):
+    tree = await service.calculate_hierarchy({'n1_diretoria': 'b'})
+    empty_tree = await service.calculate_hierarchy(end=date(2000, 1, 1))
+
+    assert tree['respondents'] == 1
+    assert [node['name'] for node in tree['children'][0]['children']] == ['b']
+    assert empty_tree == {
+        'level': None,
+        'name': None,
+        'respondents': 0,
+        'nps': None,
+        'means': {},
+        'children': [],
+    }
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_calculate_hierarchy_should_count_respondents_of_any_question(
+    session, use_rollups
+):
+    expected_respondents = 2
+    empresa = DimensaoFactory(tipo='n0_empresa', valor='empresa')
+    for pergunta in (PerguntaFactory(pergunta='eNPS'), PerguntaFactory()):
+        RespostaFactory(
+            entrevistado=EntrevistadoFactory(n0_empresa_dimensao=empresa),
+            pergunta=pergunta,
+        )
+        session.add(pergunta)
+    await session.commit()
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+
+    tree = await service.calculate_hierarchy()
+
+    assert tree['respondents'] == expected_respondents
+    assert tree['children'][0]['respondents'] == expected_respondents
+
+
+async def test_rollup_hierarchy_should_match_raw_tables(
+    service, rollup_service, session, entrevistados
+):
+    await refresh_rollups(session)
+
+    assert await rollup_service.calculate_hierarchy() == (
+        await service.calculate_hierarchy()
+    )
+
+
+@pytest.mark.parametrize('use_rollups', [False, True])
+async def test_count_locations_should_count_every_location_in_one_query(
+    session, entrevistados, use_rollups, statements
+):
+    expected_queries = 2
+    await refresh_rollups(session)
+    service = CalculationService(session, use_rollups)
+    locations = sorted(
+        entrevistado.localidade_dimensao.valor
+        for entrevistado in entrevistados
+    )
+    statements.clear()
+
+    counts = await service.interviewed_by_locations()
+    requested_counts = await service.interviewed_by_locations([
+        locations[0],
+        'invalid',
+    ])
+
+    assert counts == dict.fromkeys(locations, 1)
+    assert requested_counts == {locations[0]: 1, 'invalid': 0}
+    assert len(statements) == expected_queries
+
+
+@pytest.fixture
+def cache():
+    return ResultCache(
+        MemoryCacheBackend(max_entries=8), ttl=60, version_ttl=0
+    )
+
+
+async def test_cached_calculation_should_skip_database_on_hit(
+    session, entrevistado, cache, statements
+):
+    service = CalculationService(session, cache=cache)
+    nps_data = await service.calculate_nps()
+    statements.clear()
+
+    cached_nps_data = await service.calculate_nps()
+
+    assert cached_nps_data == nps_data
+    assert statements == []
+    assert cache.stats['hits'] == 1
+
+
+async def test_cached_calculation_should_recompute_on_new_version(
+    session, entrevistado, cache
+):
+    expected_misses = 2
+    location = entrevistado.localidade_dimensao.valor
+    versions = DatasetVersionService(session)
+    service = CalculationService(session, cache=cache)
+    await cache.sync_version(versions.get)
+    await service.interviewed_by_location(location)
+    await versions.bump()
+    await cache.sync_version(versions.get)
+
+    await service.interviewed_by_location(location)
+
+    assert cache.stats['misses'] == expected_misses
+    assert cache.stats['version'] == 1
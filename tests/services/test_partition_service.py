@@ -0,0 +1,89 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy import func, select, text
+
+from playground_api.models import DEFAULT_PARTITION
+from playground_api.services import PartitionService, month_bounds
+from tests.conftest import RespostaFactory
+
+
+def test_month_bounds_should_end_on_next_month():
+    assert month_bounds(date(2022, 12, 15)) == (
+        date(2022, 12, 1),
+        date(2023, 1, 1),
+    )
+
+
+async def test_existing_should_list_default_partition(session):
+    partitions = await PartitionService(session).existing()
+
+    assert partitions == {DEFAULT_PARTITION}
+
+
+async def test_create_should_route_month_answers_to_partition(session):
+    service = PartitionService(session)
+    name = await service.create(date(2022, 1, 20))
+    session.add(RespostaFactory(data=date(2022, 1, 31)))
+    session.add(RespostaFactory(data=date(2022, 2, 1)))
+    await session.commit()
+
+    count = await session.scalar(select(func.count()).select_from(text(name)))
+
+    assert name == 'respostas_2022_01'
+    assert await service.existing() == {DEFAULT_PARTITION, name}
+    assert count == 1
+
+
+async def test_create_should_skip_attached_partition(session):
+    service = PartitionService(session)
+    await service.create(date(2022, 1, 1))
+
+    name = await service.create(date(2022, 1, 31))
+
+    assert await service.existing() == {DEFAULT_PARTITION, name}
+
+
+async def test_concurrent_create_should_attach_partition_once(session, engine):
+    async def create():
+        async with engine.begin() as connection:
+            return await PartitionService(connection).create(date(2022, 1, 1))
+
+    names = await asyncio.gather(create(), create())
+
+    assert await PartitionService(session).existing() == {
+        DEFAULT_PARTITION,
+        *names,
+    }
+    assert names[0] == names[1]
+
+
+async def test_create_should_attach_detached_partition(session):
+    service = PartitionService(session)
+    name = await service.create(date(2022, 1, 1))
+    session.add(RespostaFactory(data=date(2022, 1, 10)))
+    await session.commit()
+    await session.execute(
+        text(f'ALTER TABLE respostas DETACH PARTITION {name}')
+    )
+
+    await service.create(date(2022, 1, 1))
+    count = await session.scalar(select(func.count()).select_from(text(name)))
+
+    assert await service.existing() == {DEFAULT_PARTITION, name}
+    assert count == 1
+
+
+async def test_create_should_move_month_answers_from_default(session):
+    session.add(RespostaFactory(data=date(2022, 1, 10)))
+    session.add(RespostaFactory(data=date(2022, 2, 10)))
+    await session.commit()
+
+    name = await PartitionService(session).create(date(2022, 1, 1))
+    moved = await session.scalar(select(func.count()).select_from(text(name)))
+    kept = await session.scalar(
+        select(func.count()).select_from(text(DEFAULT_PARTITION))
+    )
+
+    assert moved == 1
+    assert kept == 1
@@ -0,0 +1,137 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from playground_api.services import (
+    CalculationService,
+    PartitionService,
+    ResponseService,
+    RollupService,
+)
+from tests.conftest import RespostaFactory
+
+
+def plan_values(plan, key):
+    values = set()
+    if key in plan:
+        values.add(plan[key])
+    for child in plan.get('Plans', []):
+        values |= plan_values(child, key)
+
+    return values
+
+
+async def explain(connection, statement, parameters):
+    result = await connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {statement}', parameters
+    )
+    (plan,) = result.scalar()
+
+    return plan['Plan']
+
+
+async def used_indexes(session, statement, parameters):
+    # The test tables are tiny, so sequential scans are disabled to check
+    # which indexes the planner can use for the query.
+    connection = await session.connection()
+    await connection.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = await explain(connection, statement, parameters)
+    # Partition indexes are reported by the name of the respostas index
+    # they were created from.
+    parents = await connection.execute(
+        text(
+            'SELECT coalesce(inhparent::regclass::text, name) '
+            'FROM unnest(CAST(:names AS text[])) AS name '
+            'LEFT JOIN pg_inherits ON inhrelid = name::regclass'
+        ),
+        {'names': list(plan_values(plan, 'Index Name'))},
+    )
+
+    return set(parents.scalars())
+
+
+async def test_nps_should_scan_question_and_score_index(
+    engine, session, entrevistados, statements
+):
+    # Index-only scans need an up to date visibility map
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level='AUTOCOMMIT')
+        await connection.execute(text('VACUUM ANALYZE respostas'))
+    await CalculationService(session).calculate_nps()
+
+    indexes = await used_indexes(session, *statements[-1])
+
+    assert {'ix_perguntas_pergunta', 'ix_respostas_pergunta_fk_nota'} <= (
+        indexes
+    )
+
+
+async def test_by_location_should_scan_location_index(
+    session, entrevistados, statements
+):
+    await ResponseService(session).get_by_location(
+        0, 10, entrevistados[0].localidade_dimensao.valor
+    )
+
+    indexes = await used_indexes(session, *statements[-1])
+
+    assert 'ix_entrevistados_localidade_fk_id' in indexes
+
+
+async def test_pergunta_respostas_should_scan_question_index(
+    session, entrevistados, statements
+):
+    await ResponseService(session).get_pergunta_respostas(0, 10, 1, 5)
+
+    indexes = await used_indexes(session, *statements[-1])
+
+    assert 'ix_respostas_pergunta_fk_id' in indexes
+
+
+async def test_date_bounded_nps_should_only_scan_month_partition(
+    session, entrevistados, statements
+):
+    await PartitionService(session).create(date(2022, 1, 1))
+    session.add(RespostaFactory(data=date(2022, 1, 10)))
+    await session.commit()
+    await CalculationService(session).calculate_nps(
+        date(2022, 1, 1), date(2022, 1, 31)
+    )
+
+    plan = await explain(await session.connection(), *statements[-1])
+
+    assert 'respostas_2022_01' in plan_values(plan, 'Relation Name')
+    assert 'respostas_default' not in plan_values(plan, 'Relation Name')
+
+
+async def test_date_bounded_trend_should_scan_date_index(
+    session, entrevistados, statements
+):
+    await CalculationService(session).calculate_trend(
+        start=date(2022, 1, 1), end=date(2022, 1, 31)
+    )
+
+    indexes = await used_indexes(session, *statements[-1])
+
+    assert 'ix_respostas_data' in indexes
+
+
+@pytest.mark.parametrize(
+    ('use_rollups', 'index'),
+    [
+        (False, 'ix_entrevistados_localidade_fk_id'),
+        (True, 'ix_respostas_rollup_localidade_pergunta_fk'),
+    ],
+)
+async def test_single_location_count_should_scan_location_index(
+    session, entrevistados, statements, use_rollups, index
+):
+    await RollupService(session).refresh()
+    await CalculationService(session, use_rollups).interviewed_by_location(
+        entrevistados[0].localidade_dimensao.valor
+    )
+
+    indexes = await used_indexes(session, *statements[-1])
+
+    assert index in indexes
@@ -1,7 +1,8 @@
 import pytest
 
 from playground_api.schemas import EntrevistadoFlatResponse
-from playground_api.services import ResponseService
+from playground_api.services import ANSWERED_KEYS, ResponseService
+from tests.conftest import QUESTIONS, EntrevistadoFactory
 
 
 @pytest.fixture
@@ -38,7 +39,7 @@ async def test_query_non_existing_pergunta_should_return_respostas(
 
 
 async def test_query_company_should_return_responses(service, entrevistado):
-    location = entrevistado.localidade
+    location = entrevistado.localidade_dimensao.valor
     entrevistados = await service.get_by_location(0, 5, location)
 
     assert len(entrevistados) == 1
@@ -54,3 +55,124 @@ async def test_query_entrevistados_should_return_flat_list(
 
     assert len(entrevistados) == 1
     assert isinstance(entrevistados[0], EntrevistadoFlatResponse)
+
+
+async def test_query_entrevistados_should_return_respostas(
+    service, entrevistado
+):
+    respostas = await entrevistado.awaitable_attrs.respostas
+
+    entrevistados = await service.get_entrevistados(0, 5)
+
+    assert [r.nota for r in entrevistados[0].respostas] == [
+        r.nota for r in respostas
+    ]
+
+
+async def test_query_entrevistados_without_respostas_should_return_empty(
+    service, session
+):
+    session.add(EntrevistadoFactory())
+    await session.commit()
+
+    entrevistados = await service.get_entrevistados(0, 5)
+
+    assert entrevistados[0].respostas == []
+
+
+async def test_query_entrevistados_should_paginate_interviewed(
+    service, entrevistados
+):
+    first_page = await service.get_entrevistados(0, 2)
+    second_page = await service.get_entrevistados(2, 2)
+
+    assert [e.id for e in first_page + second_page] == [
+        e.id for e in entrevistados
+    ]
+    assert all(
+        len(e.respostas) == len(QUESTIONS) for e in first_page + second_page
+    )
+
+
+async def test_query_entrevistados_should_issue_one_statement(
+    service, entrevistados, statements
+):
+    await service.get_entrevistados(0, 5)
+
+    assert len(statements) == 1
+
+
+async def test_query_pergunta_should_issue_one_statement(
+    service, resposta, statements
+):
+    await service.get_pergunta_respostas(0, 5, resposta.pergunta_fk)
+
+    assert len(statements) == 1
+
+
+async def test_query_company_should_issue_one_statement(
+    service, entrevistados, statements
+):
+    await service.get_by_location(
+        0, 5, entrevistados[0].localidade_dimensao.valor
+    )
+
+    assert len(statements) == 1
+
+
+async def test_query_flat_list_should_issue_one_statement(
+    service, entrevistados, statements
+):
+    await service.get_entrevistados_flat_list(0, 5)
+
+    assert len(statements) == 1
+
+
+async def test_query_entrevistados_after_id_should_return_next_page(
+    service, entrevistados
+):
+    result = await service.get_entrevistados(
+        0, 5, after_id=entrevistados[0].id
+    )
+
+    assert [e.id for e in result] == [e.id for e in entrevistados[1:]]
+
+
+async def test_query_pergunta_after_id_should_skip_seen_respostas(
+    service, resposta
+):
+    respostas = await service.get_pergunta_respostas(
+        0, 5, resposta.pergunta_fk, after_id=resposta.id
+    )
+
+    assert respostas == []
+
+
+async def test_stream_flat_should_yield_every_entrevistado(
+    service, entrevistados
+):
+    # A chunk smaller than the respondent count makes the stream span
+    # several fetches without dropping or repeating rows.
+    chunk_size = 2
+
+    result = [
+        entrevistado
+        async for entrevistado in service.stream_entrevistados_flat(chunk_size)
+    ]
+
+    assert [e.id for e in result] == [e.id for e in entrevistados]
+    assert all(isinstance(e, EntrevistadoFlatResponse) for e in result)
+
+
+async def test_query_flat_list_should_pivot_answers(service, entrevistado):
+    respostas = await entrevistado.awaitable_attrs.respostas
+    notas = {}
+    for resposta in respostas:
+        pergunta = await resposta.awaitable_attrs.pergunta
+        notas[ANSWERED_KEYS[pergunta.pergunta]] = resposta.nota
+
+    entrevistados = await service.get_entrevistados_flat_list(0, 5)
+
+    flat = entrevistados[0].model_dump()
+    assert {key: flat[key] for key in notas} == notas
+    assert flat['data_resposta'] == min(r.data for r in respostas)
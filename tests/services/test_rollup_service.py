@@ -0,0 +1,60 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from playground_api.models import RespostaRollup
+from playground_api.services import RollupService, histogram_percentile
+from tests.conftest import QUESTIONS, RespostaFactory
+
+
+async def rollup_total(session):
+    return await session.scalar(select(func.sum(RespostaRollup.total)))
+
+
+async def test_refresh_should_count_every_answer(session, entrevistados):
+    await RollupService(session).refresh()
+
+    assert await rollup_total(session) == len(entrevistados) * len(QUESTIONS)
+
+
+async def test_refresh_twice_should_not_count_answers_twice(
+    session, entrevistados
+):
+    service = RollupService(session)
+    await service.refresh()
+
+    await service.refresh()
+
+    assert await rollup_total(session) == len(entrevistados) * len(QUESTIONS)
+
+
+async def test_refresh_dates_should_only_rebuild_given_dates(
+    session, entrevistado
+):
+    service = RollupService(session)
+    await service.refresh()
+    session.add(RespostaFactory(data=date(2020, 1, 1)))
+    await session.commit()
+
+    await service.refresh([date(2020, 1, 1)])
+
+    assert await rollup_total(session) == len(QUESTIONS) + 1
+
+
+def test_histogram_percentile_should_interpolate_like_percentile_cont():
+    histogram = [(1, 1), (2, 1), (3, 1), (10, 1)]
+    expected_percentiles = (1, 1.75, 2.5, 10)
+
+    percentiles = tuple(
+        histogram_percentile(histogram, quantile)
+        for quantile in (0, 0.25, 0.5, 1)
+    )
+
+    assert percentiles == expected_percentiles
+
+
+def test_histogram_percentile_should_expand_repeated_scores():
+    histogram = [(3, 3), (9, 1)]
+    expected_median = 3
+
+    assert histogram_percentile(histogram, 0.5) == expected_median
@@ -0,0 +1,195 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import literal, select
+
+from playground_api.analytics import (
+    COUNT_QUERY,
+    AnalyticsEngine,
+    load_columns,
+)
+from playground_api.services import CalculationService, DatasetVersionService
+from tests.conftest import (
+    DimensaoFactory,
+    EntrevistadoFactory,
+    PerguntaFactory,
+    RespostaFactory,
+)
+
+
+@pytest.fixture
+def analytics(engine):
+    return AnalyticsEngine(engine.connect)
+
+
+@pytest.fixture
+async def snapshot(session, analytics):
+    return await analytics.snapshot(version=1)
+
+
+@pytest.fixture
+async def area_answers(session):
+    enps = PerguntaFactory(pergunta='eNPS')
+    feedback = PerguntaFactory(pergunta='Feedback')
+    areas = {
+        area: DimensaoFactory(tipo='area', valor=area) for area in ('a', 'b')
+    }
+    answers = (
+        ('a', 10, date(2022, 1, 10)),
+        ('a', 2, date(2022, 1, 20)),
+        ('b', 9, date(2022, 2, 10)),
+        ('b', 6, date(2022, 2, 20)),
+    )
+    for area, nota, data in answers:
+        entrevistado = EntrevistadoFactory(area_dimensao=areas[area])
+        for pergunta in (enps, feedback):
+            RespostaFactory(
+                entrevistado=entrevistado,
+                pergunta=pergunta,
+                nota=nota,
+                data=data,
+            )
+        session.add(entrevistado)
+    await session.commit()
+
+
+async def test_breakdown_should_match_sql_calculations(
+    session, entrevistados, snapshot
+):
+    service = CalculationService(session)
+
+    rows = snapshot.breakdown()
+
+    medians = {row['pergunta']: row['median'] for row in rows}
+    enps = rows[-1]
+    assert medians.pop('eNPS') == enps['median']
+    assert medians == await service.calculate_medians()
+    assert enps['nps'] == await service.calculate_nps()
+    assert sum(row['count'] for row in rows) == len(snapshot)
+
+
+async def test_snapshot_should_skip_scores_out_of_range(session, analytics):
+    expected_nps = 100.0
+    enps = PerguntaFactory(pergunta='eNPS')
+    for nota in (-1, 10, 11):
+        RespostaFactory(pergunta=enps, nota=nota)
+    session.add(enps)
+    await session.commit()
+
+    snapshot = await analytics.snapshot(version=1)
+
+    assert len(snapshot) == 1
+    assert snapshot.breakdown()[0]['nps'] == expected_nps
+
+
+async def test_breakdown_should_group_by_dimension(area_answers, snapshot):
+    rows = snapshot.breakdown(['area'], pergunta='eNPS')
+
+    assert rows == [
+        {
+            'pergunta': 'eNPS',
+            'group': {'area': 'a'},
+            'count': 2,
+            'mean': 6.0,
+            'median': 6.0,
+            'nps': 0.0,
+            'distribution': [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1],
+        },
+        {
+            'pergunta': 'eNPS',
+            'group': {'area': 'b'},
+            'count': 2,
+            'mean': 7.5,
+            'median': 7.5,
+            'nps': 0.0,
+            'distribution': [0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 0],
+        },
+    ]
+
+
+async def test_breakdown_should_apply_filters_and_dates(
+    area_answers, snapshot
+):
+    expected_nps = 100.0
+
+    rows = snapshot.breakdown(
+        filters={'area': 'b'}, start=date(2022, 2, 1), end=date(2022, 2, 15)
+    )
+
+    assert [(row['pergunta'], row['count']) for row in rows] == [
+        ('Feedback', 1),
+        ('eNPS', 1),
+    ]
+    assert rows[0]['nps'] is None
+    assert rows[1]['nps'] == expected_nps
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'filters': {'area': 'invalid'}},
+        {'pergunta': 'invalid'},
+        {'start': date(2023, 1, 1)},
+    ],
+)
+async def test_breakdown_without_matches_should_return_empty_list(
+    area_answers, snapshot, params
+):
+    assert snapshot.breakdown(**params) == []
+
+
+async def test_snapshot_should_serve_previous_version_while_refreshing(
+    session, entrevistado, analytics
+):
+    versions = DatasetVersionService(session)
+    first = await analytics.snapshot(await versions.get())
+    await versions.bump()
+    await session.commit()
+    version = await versions.get()
+
+    stale = await analytics.snapshot(version)
+    second = await analytics.refresh(version)
+
+    assert stale is first
+    assert second.version == version
+    assert await analytics.snapshot(version) is second
+
+
+async def test_warm_up_should_load_current_version(
+    session, entrevistado, analytics
+):
+    versions = DatasetVersionService(session)
+    await versions.bump()
+    await session.commit()
+
+    await analytics.warm_up()
+
+    assert analytics.version == await versions.get()
+
+
+async def test_stop_should_cancel_pending_refresh(
+    session, entrevistado, analytics
+):
+    await analytics.snapshot(version=1)
+    await analytics.snapshot(version=2)
+
+    await analytics.stop()
+    await analytics.stop()
+
+    assert analytics.version == 1
+
+
+async def test_load_columns_should_keep_answers_added_after_counting(
+    session, entrevistados, monkeypatch
+):
+    connection = await session.connection()
+    answers = await connection.scalar(COUNT_QUERY)
+    monkeypatch.setattr(
+        'playground_api.analytics.COUNT_QUERY', select(literal(0))
+    )
+
+    columns = await load_columns(connection)
+
+    assert len(columns) == answers
+    assert columns.dtype == np.int32
@@ -0,0 +1,266 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi import Request, Response
+
+from playground_api.cache import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResultCache,
+    check_etag,
+    create_backend,
+)
+from playground_api.settings import Settings
+
+
+@pytest.fixture
+def redis_backend():
+    return RedisCacheBackend(FakeAsyncRedis())
+
+
+async def test_memory_backend_should_evict_least_recently_used_key():
+    max_entries = 2
+    backend = MemoryCacheBackend(max_entries)
+    await backend.set('nps', 10.0, 60)
+    await backend.set('medians', {}, 60)
+    await backend.get('nps')
+
+    await backend.set('location', 1, 60)
+
+    assert await backend.get('medians') == (False, None)
+    assert await backend.get('nps') == (True, 10.0)
+    assert backend.size() == max_entries
+
+
+async def test_memory_backend_should_expire_keys():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set('nps', 10.0, 0)
+
+    assert await backend.get('nps') == (False, None)
+    assert backend.size() == 0
+
+
+async def test_redis_backend_should_store_json_values(redis_backend):
+    medians = {'Feedback': 2.5}
+    await redis_backend.set('medians', medians, 60)
+
+    assert await redis_backend.get('medians') == (True, medians)
+    assert await redis_backend.get('nps') == (False, None)
+    assert redis_backend.size() is None
+
+
+async def test_redis_backend_clear_should_drop_prefixed_keys(redis_backend):
+    await redis_backend.set('nps', 10.0, 60)
+
+    await redis_backend.clear()
+    await redis_backend.clear()
+
+    assert await redis_backend.get('nps') == (False, None)
+
+
+async def test_redis_backend_should_only_release_its_own_lock():
+    server = FakeServer()
+    first = RedisCacheBackend(FakeAsyncRedis(server=server))
+    second = RedisCacheBackend(FakeAsyncRedis(server=server))
+    await second.acquire('nps', 60)
+
+    await first.release('nps')
+
+    assert not await first.acquire('nps', 60)
+    await second.release('nps')
+    assert await first.acquire('nps', 60)
+
+
+async def test_get_or_compute_should_count_hits_and_misses(redis_backend):
+    nps = 10.0
+    cache = ResultCache(redis_backend, ttl=60, version_ttl=60)
+
+    async def compute():
+        return nps
+
+    await cache.get_or_compute('nps', compute)
+    value = await cache.get_or_compute('nps', compute)
+
+    assert value == nps
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+
+
+async def test_get_or_compute_should_coalesce_concurrent_misses():
+    requests = 3
+    calls = []
+    release = asyncio.Event()
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=60)
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return 10.0
+
+    tasks = [
+        asyncio.create_task(cache.get_or_compute('nps', compute))
+        for _ in range(requests)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [10.0] * requests
+    assert len(calls) == 1
+    assert cache.stats['coalesced'] == requests - 1
+
+
+async def test_get_or_compute_should_share_computation_between_workers():
+    calls = []
+    release = asyncio.Event()
+    server = FakeServer()
+    caches = [
+        ResultCache(
+            RedisCacheBackend(FakeAsyncRedis(server=server)),
+            ttl=60,
+            version_ttl=60,
+            lock_poll=0.01,
+        )
+        for _ in range(2)
+    ]
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return 10.0
+
+    tasks = [
+        asyncio.create_task(cache.get_or_compute('nps', compute))
+        for cache in caches
+    ]
+    await asyncio.sleep(0.05)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [10.0, 10.0]
+    assert len(calls) == 1
+
+
+async def test_get_or_compute_should_retry_when_computing_task_is_cancelled():
+    nps = 10.0
+    expected_calls = 2
+    calls = []
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=60)
+
+    async def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.Event().wait()
+        return nps
+
+    leader = asyncio.create_task(cache.get_or_compute('nps', compute))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_compute('nps', compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == nps
+    assert leader.cancelled()
+    assert len(calls) == expected_calls
+
+
+async def test_cancelled_waiter_should_not_cancel_computation():
+    nps = 10.0
+    release = asyncio.Event()
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=60)
+
+    async def compute():
+        await release.wait()
+        return nps
+
+    leader = asyncio.create_task(cache.get_or_compute('nps', compute))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_compute('nps', compute))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == nps
+    assert waiter.cancelled()
+
+
+async def test_get_or_compute_should_not_cache_errors():
+    release = asyncio.Event()
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=60)
+
+    async def compute():
+        await release.wait()
+        raise ValueError('database is down')
+
+    tasks = [
+        asyncio.create_task(cache.get_or_compute('nps', compute))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.stats['size'] == 0
+
+
+async def test_sync_version_should_change_cache_keys():
+    new_version = 2
+    versions = iter((1, new_version))
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=0)
+
+    async def load_version():
+        return next(versions)
+
+    async def compute():
+        return 10.0
+
+    await cache.sync_version(load_version)
+    await cache.get_or_compute('nps', compute)
+    await cache.sync_version(load_version)
+    await cache.get_or_compute('nps', compute)
+
+    assert cache.stats['misses'] == new_version
+    assert cache.stats['version'] == new_version
+
+
+async def test_sync_version_should_reuse_version_until_it_expires():
+    calls = []
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=60)
+
+    async def load_version():
+        calls.append(1)
+        return 1
+
+    await cache.sync_version(load_version)
+    await cache.sync_version(load_version)
+
+    assert len(calls) == 1
+
+
+def test_create_backend_should_use_redis_when_cache_url_is_set():
+    settings = Settings(CACHE_URL='redis://localhost:6379/0')
+
+    assert isinstance(create_backend(settings), RedisCacheBackend)
+
+
+def test_create_backend_should_default_to_memory():
+    settings = Settings(CACHE_URL=None)
+
+    assert isinstance(create_backend(settings), MemoryCacheBackend)
+
+
+async def test_check_etag_should_change_with_dataset_version():
+    versions = iter((1, 2))
+    cache = ResultCache(MemoryCacheBackend(8), ttl=60, version_ttl=0)
+    request = Request({'type': 'http', 'headers': []})
+
+    async def load_version():
+        return next(versions)
+
+    await cache.sync_version(load_version)
+    first_headers = await check_etag(request, Response(), cache)
+    await cache.sync_version(load_version)
+    second_headers = await check_etag(request, Response(), cache)
+
+    assert first_headers['ETag'] != second_headers['ETag']
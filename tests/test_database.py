@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from playground_api.database import ReplicaRouter, engine_options
+from playground_api.settings import Settings
+
+UNREACHABLE_URL = 'postgresql+psycopg://postgres@127.0.0.1:1/playground'
+
+
+def test_engine_options_should_use_pool_settings():
+    settings = Settings(DB_POOL_SIZE=20, DB_STATEMENT_TIMEOUT_MS=None)
+
+    options = engine_options(settings)
+
+    assert options['pool_size'] == settings.DB_POOL_SIZE
+    assert options['pool_pre_ping'] is settings.DB_POOL_PRE_PING
+    assert options['connect_args'] == {
+        'prepare_threshold': settings.DB_PREPARE_THRESHOLD
+    }
+
+
+def test_engine_options_should_set_statement_timeout():
+    settings = Settings(DB_STATEMENT_TIMEOUT_MS=500)
+
+    options = engine_options(settings)
+
+    assert options['connect_args']['options'] == '-c statement_timeout=500'
+
+
+def test_engine_options_should_skip_statement_timeout_for_imports():
+    settings = Settings(DB_STATEMENT_TIMEOUT_MS=500)
+
+    options = engine_options(settings, limit_statements=False)
+
+    assert 'options' not in options['connect_args']
+
+
+@pytest.fixture
+async def replicas(engine):
+    # Two stand-in replicas pointing to the test database
+    engines = [create_async_engine(engine.url) for _ in range(2)]
+    yield engines
+    for replica in engines:
+        await replica.dispose()
+
+
+@pytest.fixture
+async def unreachable_engine():
+    engine = create_async_engine(UNREACHABLE_URL)
+    yield engine
+    await engine.dispose()
+
+
+async def connected_engine(router):
+    connection = await router.connect()
+    await connection.close()
+
+    return connection.engine
+
+
+async def test_replica_router_should_round_robin_replicas(engine, replicas):
+    router = ReplicaRouter(engine, replicas, retry_after=30)
+
+    engines = [await connected_engine(router) for _ in range(4)]
+
+    assert engines == [*replicas, *replicas]
+
+
+async def test_replica_router_should_skip_unhealthy_replica(
+    engine, replicas, unreachable_engine
+):
+    router = ReplicaRouter(
+        engine, [unreachable_engine, replicas[0]], retry_after=30
+    )
+
+    engines = [await connected_engine(router) for _ in range(2)]
+
+    assert engines == [replicas[0], replicas[0]]
+    assert router.health() == [False, True]
+
+
+async def test_replica_router_should_fall_back_to_primary(
+    engine, unreachable_engine
+):
+    router = ReplicaRouter(engine, [unreachable_engine], retry_after=30)
+
+    assert await connected_engine(router) is engine
+    assert await connected_engine(router) is engine
+
+
+async def test_replica_router_without_replicas_should_use_primary(engine):
+    router = ReplicaRouter(engine, [], retry_after=30)
+
+    connection = await router.connect_primary()
+    await connection.close()
+
+    assert connection.engine is engine
+    assert router.health() == []
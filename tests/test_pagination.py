@@ -0,0 +1,17 @@
+import pytest
+
+from playground_api.pagination import decode_cursor, encode_cursor
+
+
+def test_decode_cursor_should_return_encoded_id():
+    last_id = 1234
+
+    assert decode_cursor(encode_cursor(last_id)) == last_id
+
+
+@pytest.mark.parametrize(
+    'cursor', ['not-base64!', 'bm90LWpzb24', 'WyJhIl0', 'W3RydWVd']
+)
+def test_decode_invalid_cursor_should_raise_value_error(cursor):
+    with pytest.raises(ValueError, match='invalid cursor'):
+        decode_cursor(cursor)
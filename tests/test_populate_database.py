@@ -0,0 +1,306 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select, text
+
+import populate_database
+from playground_api.models import (
+    Dimensao,
+    Entrevistado,
+    Pergunta,
+    Resposta,
+    RespostaRollup,
+)
+from playground_api.services import DatasetVersionService, PartitionService
+
+DATA_CSV = Path(__file__).parents[1] / 'data.csv'
+ROWS = 3
+QUESTIONS = 8
+
+
+@pytest.fixture
+def csv_lines():
+    return DATA_CSV.read_text(encoding='utf-8').splitlines()[: ROWS + 1]
+
+
+@pytest.fixture
+def csv_file(tmp_path, csv_lines):
+    path = tmp_path / 'data.csv'
+    path.write_text('\n'.join(csv_lines), encoding='utf-8')
+
+    return path
+
+
+@pytest.fixture
+def populator_engine(engine, monkeypatch):
+    monkeypatch.setattr(populate_database, 'async_engine', engine)
+
+
+def write_csv(path, start):
+    header, *lines = DATA_CSV.read_text(encoding='utf-8').splitlines()
+    rows = lines[start : start + ROWS]
+    path.write_text('\n'.join([header, *rows]), encoding='utf-8')
+
+    return path
+
+
+async def count(session, model):
+    return await session.scalar(select(func.count(model.id)))
+
+
+async def test_import_should_load_all_rows_in_batches(
+    session, populator_engine, csv_file, statements
+):
+    batch_size = 2
+    batches = 2
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process(batch_size)
+
+    partitioned = await session.scalar(
+        select(func.count()).select_from(text('respostas_2022_01'))
+    )
+    dimensions = (
+        await session.execute(select(Dimensao.tipo, Dimensao.valor))
+    ).all()
+    inserts = [
+        statement
+        for statement, _ in statements
+        if statement.startswith('INSERT INTO entrevistados')
+    ]
+    assert await count(session, Entrevistado) == ROWS
+    assert await count(session, Resposta) == ROWS * QUESTIONS
+    assert partitioned == ROWS * QUESTIONS
+    assert len(dimensions) == len(set(dimensions))
+    assert await session.scalar(select(func.sum(RespostaRollup.total))) == (
+        ROWS * QUESTIONS
+    )
+    assert await DatasetVersionService(session).get() == 1
+    assert len(inserts) == batches
+
+
+async def test_bulk_import_should_load_all_rows(
+    session, populator_engine, csv_file
+):
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1)
+
+    assert await count(session, Entrevistado) == ROWS
+    assert await count(session, Resposta) == ROWS * QUESTIONS
+    assert await count(session, Pergunta) == QUESTIONS
+    assert await session.scalar(select(func.sum(RespostaRollup.total))) == (
+        ROWS * QUESTIONS
+    )
+
+
+async def test_bulk_import_should_create_monthly_partitions(
+    session, populator_engine, csv_file
+):
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1)
+
+    partitioned = await session.scalar(
+        select(func.count()).select_from(text('respostas_2022_01'))
+    )
+    assert 'respostas_2022_01' in await PartitionService(session).existing()
+    assert partitioned == ROWS * QUESTIONS
+
+
+async def test_bulk_import_should_skip_invalid_rows(
+    session, populator_engine, csv_lines, tmp_path
+):
+    fields = csv_lines[1].split(';')
+    fields[16] = '11'
+    csv_lines[1] = ';'.join(fields)
+    csv_file = tmp_path / 'invalid.csv'
+    csv_file.write_text('\n'.join(csv_lines), encoding='utf-8')
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1)
+
+    assert await count(session, Entrevistado) == ROWS - 1
+    assert len(populator._errors) == 1
+
+
+async def test_bulk_import_should_skip_truncated_rows(
+    session, populator_engine, csv_lines, tmp_path
+):
+    csv_lines[1] = csv_lines[1].rsplit(';', 1)[0]
+    csv_file = tmp_path / 'truncated.csv'
+    csv_file.write_text('\n'.join(csv_lines), encoding='utf-8')
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1)
+
+    assert await count(session, Entrevistado) == ROWS - 1
+    assert len(populator._errors) == 1
+    assert 'missing fields' in populator._errors[0]
+
+
+async def test_bulk_import_should_parse_in_workers_for_many_writers(
+    session, populator_engine, tmp_path
+):
+    files = 2
+    csv_files = [
+        write_csv(tmp_path / f'data_{index}.csv', index * ROWS)
+        for index in range(files)
+    ]
+    populator = populate_database.DataCSVPopulator(csv_files)
+
+    await populator.process_bulk(batch_size=1, workers=2, writers=3)
+
+    assert await count(session, Entrevistado) == files * ROWS
+    assert await count(session, Resposta) == files * ROWS * QUESTIONS
+    assert populator._errors == []
+
+
+async def test_bulk_import_workers_should_report_csv_line_of_errors(
+    session, populator_engine, csv_lines, tmp_path
+):
+    # The invalid row starts the second batch of two rows
+    invalid_line = 4
+    fields = csv_lines[invalid_line - 1].split(';')
+    fields[16] = '11'
+    csv_lines[invalid_line - 1] = ';'.join(fields)
+    csv_file = tmp_path / 'invalid.csv'
+    csv_file.write_text('\n'.join(csv_lines), encoding='utf-8')
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(batch_size=2, workers=2, writers=2)
+
+    assert await count(session, Entrevistado) == ROWS - 1
+    assert len(populator._errors) == 1
+    assert populator._errors[0].startswith(f'{csv_file}:{invalid_line}:')
+
+
+async def test_import_should_store_each_dimension_value_once(
+    session, populator_engine, csv_file
+):
+    await populate_database.DataCSVPopulator([csv_file]).process_bulk(
+        workers=0, writers=1, incremental=True
+    )
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1, incremental=True)
+
+    dimensions = (
+        await session.execute(select(Dimensao.tipo, Dimensao.valor))
+    ).all()
+    assert len(dimensions) == len(set(dimensions))
+    assert set(populator._dimension_ids) == set(dimensions)
+
+
+async def test_import_should_bump_dataset_version(
+    session, populator_engine, csv_file
+):
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1)
+
+    assert await DatasetVersionService(session).get() == 1
+
+
+async def test_bulk_import_twice_should_ask_for_incremental_mode(
+    session, populator_engine, csv_file
+):
+    await populate_database.DataCSVPopulator([csv_file]).process_bulk(
+        workers=0, writers=1
+    )
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    with pytest.raises(
+        populate_database.AlreadyImportedError, match='--incremental'
+    ):
+        await populator.process_bulk(workers=0, writers=1)
+
+    assert await count(session, Entrevistado) == ROWS
+
+
+async def test_import_twice_should_ask_for_incremental_mode(
+    session, populator_engine, csv_file
+):
+    await populate_database.DataCSVPopulator([csv_file]).process()
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    with pytest.raises(
+        populate_database.AlreadyImportedError, match='--incremental'
+    ):
+        await populator.process()
+
+    assert await count(session, Entrevistado) == ROWS
+
+
+async def test_import_should_reuse_stored_questions(
+    session, populator_engine, csv_file, tmp_path
+):
+    await populate_database.DataCSVPopulator([csv_file]).process()
+    other_file = write_csv(tmp_path / 'other.csv', ROWS)
+
+    await populate_database.DataCSVPopulator([other_file]).process()
+
+    assert await count(session, Entrevistado) == 2 * ROWS
+    assert await count(session, Pergunta) == QUESTIONS
+
+
+async def test_incremental_import_twice_should_not_duplicate_rows(
+    session, populator_engine, csv_file
+):
+    await populate_database.DataCSVPopulator([csv_file]).process_bulk(
+        workers=0, writers=1, incremental=True
+    )
+    populator = populate_database.DataCSVPopulator([csv_file])
+
+    await populator.process_bulk(workers=0, writers=1, incremental=True)
+
+    assert await count(session, Entrevistado) == ROWS
+    assert await count(session, Resposta) == ROWS * QUESTIONS
+    assert populator._stats['inserted'] == 0
+    assert populator._stats['unchanged'] == ROWS
+
+
+async def test_incremental_import_should_update_changed_rows(
+    session, populator_engine, csv_lines, csv_file, tmp_path
+):
+    await populate_database.DataCSVPopulator([csv_file]).process_bulk(
+        workers=0, writers=1, incremental=True
+    )
+    new_score = 3
+    fields = csv_lines[1].split(';')
+    fields[16] = str(new_score)
+    csv_lines[1] = ';'.join(fields)
+    changed_file = tmp_path / 'changed.csv'
+    changed_file.write_text('\n'.join(csv_lines), encoding='utf-8')
+    populator = populate_database.DataCSVPopulator([changed_file])
+
+    await populator.process_bulk(workers=0, writers=1, incremental=True)
+
+    assert populator._stats['updated'] == 1
+    assert populator._stats['unchanged'] == ROWS - 1
+    assert await count(session, Resposta) == ROWS * QUESTIONS
+    score = await session.scalar(
+        select(Resposta.nota)
+        .join(Resposta.entrevistado)
+        .join(Resposta.pergunta)
+        .where(
+            Entrevistado.email_corporativo == fields[2],
+            Pergunta.pergunta == 'Interesse no Cargo',
+        )
+    )
+    assert score == new_score
+    rollup_histogram = await session.execute(
+        select(RespostaRollup.nota, func.sum(RespostaRollup.total))
+        .join(Pergunta, Pergunta.id == RespostaRollup.pergunta_fk)
+        .where(Pergunta.pergunta == 'Interesse no Cargo')
+        .group_by(RespostaRollup.nota)
+        .order_by(RespostaRollup.nota)
+    )
+    raw_histogram = await session.execute(
+        select(Resposta.nota, func.count())
+        .join(Resposta.pergunta)
+        .where(Pergunta.pergunta == 'Interesse no Cargo')
+        .group_by(Resposta.nota)
+        .order_by(Resposta.nota)
+    )
+    assert rollup_histogram.all() == raw_histogram.all()